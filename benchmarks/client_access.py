@@ -0,0 +1,42 @@
+"""Attribute access overhead of locust instrumented web3 client
+
+    python -m benchmarks.client_access
+"""
+import timeit
+
+from loadtesting.locustfile import NeonWeb3ClientExt, statistics_collector
+from utils.web3client import NeonWeb3Client
+
+ACCESSES = 200_000
+PROXY_URL = "http://127.0.0.1:9090/solana"
+
+
+class LegacyNeonWeb3ClientExt(NeonWeb3Client):
+    """Former per-access wrapping client, kept for comparison"""
+
+    def __getattribute__(self, item):
+        ignore_list = ["create_account", "_send_transaction"]
+        try:
+            attr = object.__getattribute__(self, item)
+        except AttributeError:
+            attr = super(LegacyNeonWeb3ClientExt, self).__getattribute__(item)
+        if callable(attr) and item not in ignore_list:
+            attr = statistics_collector(attr.__func__).__get__(self)
+        return attr
+
+
+def main():
+    clients = {
+        "NeonWeb3Client": NeonWeb3Client(PROXY_URL, 111),
+        "NeonWeb3ClientExt (legacy)": LegacyNeonWeb3ClientExt(PROXY_URL, 111),
+        "NeonWeb3ClientExt": NeonWeb3ClientExt(PROXY_URL, 111),
+    }
+    print(f"{'Client':<30}{'metered, ns':>14}{'internal, ns':>14}")
+    for name, client in clients.items():
+        metered = timeit.timeit(lambda: client.send_neon, number=ACCESSES)
+        internal = timeit.timeit(lambda: client.get_proxy_version, number=ACCESSES)
+        print(f"{name:<30}{metered / ACCESSES * 1e9:>14.0f}{internal / ACCESSES * 1e9:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Calls per second of JsonRpcClient against local proxy stub, with and without allure tracing
+
+    python -m benchmarks.json_rpc_client
+"""
+import dataclasses
+import threading
+import time
+
+import allure
+import requests
+
+from integration.tests.basic.helpers import json_rpc_requester
+from integration.tests.basic.helpers.json_rpc_requester import JsonRpcClient
+from integration.tests.basic.helpers.rpc_request_factory import RpcRequestFactory
+from integration.tests.basic.model.model import JsonRpcResponse
+from utils.proxy_stub import ProxyStub
+
+PORT = 9095
+DURATION = 3
+BIG_DATA = "0x" + "ab" * 256 * 1024
+
+
+def legacy_call(session, url, payloads):
+    """Request path before transport rework: deep copy, whole payload and response in step titles"""
+    payloads = dataclasses.asdict(payloads)
+    with allure.step(f"Request params: {payloads}"):
+        json_doc = session.post(url, json=payloads).json()
+        with allure.step(f"Response data: {json_doc}"):
+            return JsonRpcResponse(**json_doc)
+
+
+def measure(call) -> float:
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < DURATION:
+        call()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    server = ProxyStub().serve(port=PORT)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{PORT}/solana"
+    factory = RpcRequestFactory()
+    payloads = {
+        "eth_blockNumber": lambda: factory.eth_blockNumber(),
+        "eth_call 256KB": lambda: factory.eth_call({"to": "0x" + "00" * 20, "data": BIG_DATA}, "latest"),
+    }
+    session = requests.Session()
+    traced = JsonRpcClient(url, session=session, trace=True)
+    untraced = JsonRpcClient(url, session=session, trace=False)
+    print(f"orjson: {json_rpc_requester.orjson is not None}")
+    print(f"{'request':<20}{'legacy':>10}{'traced':>10}{'untraced':>10}  calls/s")
+    try:
+        for name, payload in payloads.items():
+            legacy = measure(lambda: legacy_call(session, url, payload()))
+            fast = measure(lambda: traced.do_call(payload()))
+            off = measure(lambda: untraced.do_call(payload()))
+            print(f"{name:<20}{legacy:>10.0f}{fast:>10.0f}{off:>10.0f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Per-call overhead of locust statistics collection
+
+    python -m benchmarks.locust_events
+"""
+import sys
+import time
+import timeit
+import typing as tp
+import uuid
+
+from locust.event import EventHook
+
+from loadtesting.locustfile import RequestTimer
+
+CALLS = 100_000
+
+
+class LegacyEventHandler(object):
+    """Former `LocustEventHandler` with shared buffer, kept for comparison"""
+
+    def __init__(self, request_event: EventHook) -> None:
+        self.buffer: tp.Dict[str, tp.Any] = dict()
+        self._request_event = request_event
+
+    def init_event(self, task_id: str, request_type: str, task_name: str = "") -> None:
+        self.buffer[task_id] = dict(
+            name=task_name, start_time=time.time(), request_type=request_type, start_perf_counter=time.perf_counter()
+        )
+        "- buffer - %s" % self.buffer
+
+    def fire_event(self, task_id: str) -> None:
+        event = self.buffer.pop(task_id)
+        total_time = (time.perf_counter() - event["start_perf_counter"]) * 1000
+        self._request_event.fire(
+            name=event["name"],
+            request_type=event["request_type"],
+            response=event.get("response"),
+            response_time=total_time,
+            response_length=event.get("response_length", 0),
+            exception=event.get("exception"),
+            context={},
+        )
+
+
+def legacy_call(handler: LegacyEventHandler, func: tp.Callable) -> tp.Any:
+    task_id = str(uuid.uuid4())
+    request_type = f"`{func.__name__.replace('_', ' ')}`"
+    handler.init_event(task_id=task_id, request_type=request_type)
+    response = func()
+    handler.buffer[task_id].update(dict(response=response, response_length=sys.getsizeof(response)))
+    handler.fire_event(task_id)
+    return response
+
+
+def timer_call(request_event: EventHook, request_type: str, func: tp.Callable) -> tp.Any:
+    with RequestTimer(request_event, request_type) as timer:
+        response = func()
+        timer.response = response
+        timer.response_length = sys.getsizeof(response)
+    return response
+
+
+def get_block_number() -> int:
+    return 1
+
+
+def main():
+    request_event = EventHook()
+    request_event.add_listener(lambda **kwargs: None)
+    handler = LegacyEventHandler(request_event)
+    results = {
+        "no statistics": timeit.timeit(get_block_number, number=CALLS),
+        "LocustEventHandler (legacy)": timeit.timeit(lambda: legacy_call(handler, get_block_number), number=CALLS),
+        "RequestTimer": timeit.timeit(
+            lambda: timer_call(request_event, "`get block number`", get_block_number), number=CALLS
+        ),
+    }
+    print(f"{'Collector':<30}{'us/call':>10}")
+    for name, total in results.items():
+        print(f"{name:<30}{total / CALLS * 1_000_000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
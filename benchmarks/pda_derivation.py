@@ -0,0 +1,45 @@
+"""Program derived address lookups of ERC20Wrapper with and without memo cache
+
+    python -m benchmarks.pda_derivation
+"""
+import os
+import time
+
+from solana.publickey import PublicKey
+
+from utils.erc20wrapper import ProgramAddressCache
+
+EVM_LOADER = "53DfF883gyixYNXnM7s5xhdeyV8mVk9T4i2hGV9vG9io"
+ACCOUNTS = 200
+LOOKUPS = 5_000
+BULK_ACCOUNTS = 5_000
+
+
+def main():
+    addresses = [os.urandom(20) for _ in range(ACCOUNTS)]
+    seeds = [[b"\1", addresses[i % ACCOUNTS]] for i in range(LOOKUPS)]
+
+    start = time.perf_counter()
+    for item in seeds:
+        PublicKey.find_program_address(item, PublicKey(EVM_LOADER))
+    plain = time.perf_counter() - start
+
+    cache = ProgramAddressCache()
+    start = time.perf_counter()
+    for item in seeds:
+        cache.find(item, EVM_LOADER)
+    cached = time.perf_counter() - start
+
+    print(f"{LOOKUPS} lookups of {ACCOUNTS} accounts")
+    print(f"{'find_program_address, us':<32}{plain / LOOKUPS * 1e6:>10.1f}")
+    print(f"{'ProgramAddressCache.find, us':<32}{cached / LOOKUPS * 1e6:>10.1f}  {cache.stats()}")
+
+    bulk_seeds = [[b"\1", os.urandom(20)] for _ in range(BULK_ACCOUNTS)]
+    start = time.perf_counter()
+    ProgramAddressCache().find_many(bulk_seeds, EVM_LOADER)
+    bulk = time.perf_counter() - start
+    print(f"{'find_many of ' + str(BULK_ACCOUNTS) + ', s':<32}{bulk:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
+import ast
 import functools
 import glob
+import heapq
 import json
+import multiprocessing
 import os
 import pathlib
 import re
 import shutil
 import subprocess
 import sys
+import time
 import typing as tp
 from multiprocessing.dummy import Pool
 from urllib.parse import urlparse
@@ -24,6 +28,11 @@ try:
     from utils import web3client
     from utils import faucet
     from utils import cloud
+    from utils import accounts
+    from utils import allure
+    from utils import corpus
+    from utils import helpers
+    from utils import proxy_stub
 except ImportError:
     pass
 
@@ -79,35 +88,206 @@ with open("./envs.json", "r") as f:
     networks = json.load(f)
 
 
-def prepare_wallets_with_balance(network, count=8, airdrop_amount=20000):
-    print(f"Preparing {count} wallets with balances")
+def prepare_wallets_groups(network, groups, count=8, airdrop_amount=20000):
+    """Create `groups` sets of `count` funded wallets with one bulk faucet run, first wallet of a set gets 3 airdrops"""
+    print(f"Preparing {groups} x {count} wallets with balances")
     settings = networks[network]
     web3_client = web3client.NeonWeb3Client(settings["proxy_url"], settings["network_id"])
     faucet_client = faucet.Faucet(settings["faucet_url"])
-    private_keys = []
-
-    for i in range(count):
-        acc = web3_client.eth.account.create()
-        faucet_client.request_neon(acc.address, airdrop_amount)
-        if i == 0:
-            for _ in range(2):
-                faucet_client.request_neon(acc.address, airdrop_amount)
-        private_keys.append(acc.privateKey.hex())
-    print("All private keys: ", ",".join(private_keys))
+    wallets = [[web3_client.eth.account.create() for _ in range(count)] for _ in range(groups)]
+    funding = []
+    for group in wallets:
+        for i, acc in enumerate(group):
+            funding.extend([(acc.address, airdrop_amount)] * (3 if i == 0 else 1))
+    failed = [result for result in faucet_client.request_neon_bulk(funding) if not result.ok]
+    if failed:
+        raise RuntimeError(f"Faucet failed to fund {len(failed)} of {len(funding)} requests: {failed[0]}")
+    private_keys = [[acc.privateKey.hex() for acc in group] for group in wallets]
+    for keys in private_keys:
+        print("All private keys: ", ",".join(keys))
     return private_keys
 
 
+def prepare_wallets_with_balance(network, count=8, airdrop_amount=20000):
+    return prepare_wallets_groups(network, 1, count, airdrop_amount)[0]
+
+
+def project_solc_versions() -> tp.List[str]:
+    """Solc versions used by economy tests (`SOLCX_VERSIONS`) and load tests (`*_VERSION` constants)"""
+    versions = set()
+    sources = {
+        "integration/tests/economy/test_economics.py": "SOLCX_VERSIONS",
+        "loadtesting/locustfile.py": "_VERSION",
+    }
+    for path, suffix in sources.items():
+        for node in ast.parse(pathlib.Path(path).read_text()).body:
+            if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id.endswith(suffix) for target in node.targets
+            ):
+                value = ast.literal_eval(node.value)
+                versions.update([value] if isinstance(value, str) else value)
+    return sorted(versions, key=lambda v: tuple(map(int, v.split("."))))
+
+
+def precompile_contracts(versions, jobs=None):
+    contracts = sorted(pathlib.Path("contracts").absolute().glob("*.sol"))
+    print(f"Compiling {len(contracts)} contracts with solc {', '.join(versions)}")
+    for version in versions:
+        helpers.install_solc(version)
+    tasks = [(contract, version) for version in versions for contract in contracts]
+    with multiprocessing.Pool(jobs) as pool:
+        errors = pool.starmap(helpers.precompile_file, tasks)
+    for (contract, version), error in zip(tasks, errors):
+        if error:
+            print(f"Skipped {contract.name} with solc {version}: {error}")
+    print(f"{errors.count(None)} of {len(tasks)} artifacts are in {helpers.ARTIFACTS_CACHE}")
+
+
+def send_raw_transactions(web3_client, chain_id, account, transactions):
+    """Sign transactions with sequential nonces, send them at once and wait for the last one"""
+    nonce = web3_client.eth.get_transaction_count(account.address)
+    tx_hash = None
+    for i, transaction in enumerate(transactions):
+        signed = account.sign_transaction(dict(transaction, nonce=nonce + i, chainId=chain_id))
+        tx_hash = web3_client.eth.send_raw_transaction(signed.rawTransaction)
+    if tx_hash is not None:
+        web3_client.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def prepare_transactions_corpus(network, accounts_count=100, count=100, kinds=None, output=None, jobs=None):
+    """Pre-sign `count` transactions for each of `accounts_count` funded accounts and write them to corpus file"""
+    kinds = kinds or corpus.KINDS
+    print(f"Preparing corpus of {accounts_count * count} transactions for {network}")
+    settings = networks[network]
+    web3_client = web3client.NeonWeb3Client(settings["proxy_url"], settings["network_id"])
+    pool = accounts.AccountPool(
+        web3_client, faucet.Faucet(settings["faucet_url"]), f"corpus-accounts-{network}.json", amount=10000
+    )
+    pool.fill(accounts_count)
+    senders = pool.accounts[:accounts_count]
+    deployer = senders[0]
+    gas_price = web3_client.gas_price()
+    gas_cache = web3client.GasEstimateCache()
+    templates = {}
+
+    if "send_neon" in kinds:
+        templates["send_neon"] = {"to": senders[-1].address, "value": web3_client.toWei(1, "gwei")}
+    if "send_erc20" in kinds:
+        interface = helpers.get_contract_interface("ERC20", "0.6.6")
+        receipt = web3_client.deploy_contract(
+            deployer, interface["abi"], interface["bin"], constructor_args=[accounts_count * count]
+        )
+        erc20 = web3_client.eth.contract(address=receipt["contractAddress"], abi=interface["abi"])
+        distribution = [
+            erc20.functions.transfer(sender.address, count).buildTransaction(
+                {"from": deployer.address, "gas": 0, "gasPrice": gas_price}
+            )
+            for sender in senders[1:]
+        ]
+        gas = gas_cache.estimate(distribution[0], web3_client.eth.estimate_gas) if distribution else 0
+        send_raw_transactions(web3_client, settings["network_id"], deployer, [dict(tx, gas=gas) for tx in distribution])
+        templates["send_erc20"] = {
+            "to": erc20.address,
+            "data": erc20.encodeABI(fn_name="transfer", args=[senders[-1].address, 1]),
+        }
+    if "inc_account" in kinds or "dec_account" in kinds:
+        interface = helpers.get_contract_interface("Counter", "0.8.10")
+        receipt = web3_client.deploy_contract(deployer, interface["abi"], interface["bin"])
+        counter = web3_client.eth.contract(address=receipt["contractAddress"], abi=interface["abi"])
+        for kind in ("inc_account", "dec_account"):
+            templates[kind] = {"to": counter.address, "data": counter.encodeABI(fn_name=kind[:3])}
+    for kind, template in templates.items():
+        if kind == "dec_account":
+            # counter is zero yet and decrement reverts on estimation, it costs the same as increment
+            template["gas"] = templates["inc_account"]["gas"]
+        else:
+            template["gas"] = gas_cache.estimate(
+                dict(template, **{"from": deployer.address}), web3_client.eth.estimate_gas
+            )
+        template["gasPrice"] = gas_price
+
+    # every account sends increment before decrement, so shared counter never goes below zero on in order replay
+    kinds = [kind for kind in corpus.KINDS if kind in kinds]
+    chain_id = settings["network_id"]
+    jobs_args = []
+    for sender, nonce in zip(senders, web3_client.get_nonces(senders)):
+        transactions = []
+        for i in range(count):
+            kind = kinds[i % len(kinds)]
+            transactions.append((kind, dict(templates[kind], nonce=nonce + i, chainId=chain_id)))
+        jobs_args.append((sender.key.hex(), transactions))
+    with multiprocessing.Pool(jobs) as workers:
+        signed = workers.map(corpus.sign_transactions, jobs_args)
+    output = output or f"corpus-{network}.bin"
+    written = corpus.write_corpus(output, corpus.interleave(signed))
+    print(f"{written} transactions are written to {output}")
+    return output
+
+
+OZ_DURATIONS_FILE = "compatibility/openzeppelin-durations.json"
+"""Seconds of every OpenZeppelin test file from previous runs
+"""
+
+OZ_SECONDS_PER_KB = 2.0
+"""Duration estimate of test file without history, scaled by known files when there are any
+"""
+
+
+OZ_EPIC_LABEL = {"name": "epic", "value": "OpenZeppelin contracts"}
+
+
+def load_test_durations(path=OZ_DURATIONS_FILE) -> tp.Dict[str, float]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_test_durations(durations: tp.Dict[str, float], path=OZ_DURATIONS_FILE) -> None:
+    """Merge new durations into history as average with previous value"""
+    history = load_test_durations(path)
+    for file_name, duration in durations.items():
+        previous = history.get(file_name)
+        history[file_name] = round(duration if previous is None else (previous + duration) / 2, 2)
+    with helpers.atomic_write(path) as f:
+        json.dump(history, f, indent=2, sort_keys=True)
+
+
+def estimate_test_durations(
+    tests: tp.List[str], cwd: pathlib.Path, history: tp.Dict[str, float]
+) -> tp.Dict[str, float]:
+    """Duration from history, or from file size for new files"""
+    sizes = {file_name: (cwd / file_name).stat().st_size / 1024 for file_name in tests}
+    known = [file_name for file_name in tests if file_name in history]
+    seconds_per_kb = OZ_SECONDS_PER_KB
+    if known and sum(sizes[file_name] for file_name in known):
+        seconds_per_kb = sum(history[file_name] for file_name in known) / sum(sizes[file_name] for file_name in known)
+    return {file_name: history.get(file_name, sizes[file_name] * seconds_per_kb) for file_name in tests}
+
+
+def lpt_makespan(durations: tp.Iterable[float], jobs: int) -> float:
+    """Makespan when every next longest task goes to the least loaded job"""
+    loads = [0.0] * jobs
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
 def run_openzeppelin_tests(network, jobs=8):
     print(f"Running OpenZeppelin tests in {jobs} jobs on {network}")
     cwd = (pathlib.Path().parent / "compatibility/openzeppelin-contracts").absolute()
     subprocess.check_call("npx hardhat compile", shell=True, cwd=cwd)
     (cwd.parent / "results").mkdir(parents=True, exist_ok=True)
-    keys_env = [prepare_wallets_with_balance(network) for i in range(jobs)]
+    keys_env = prepare_wallets_groups(network, jobs)
 
     tests = subprocess.check_output("find \"test\" -name '*.test.js'", shell=True, cwd=cwd).decode().splitlines()
+    estimates = estimate_test_durations(tests, cwd, load_test_durations())
+    tests.sort(key=estimates.get, reverse=True)
 
     def run_oz_file(file_name):
         print(f"Run {file_name}")
+        started = time.monotonic()
         keys = keys_env.pop(0)
         env = os.environ.copy()
         env["PRIVATE_KEYS"] = ",".join(keys)
@@ -117,7 +297,8 @@ def run_openzeppelin_tests(network, jobs=8):
         out = subprocess.run(f"npx hardhat test {file_name}", shell=True, cwd=cwd, capture_output=True, env=env)
         stdout = out.stdout.decode()
         stderr = out.stderr.decode()
-        print(f"Test {file_name} finished with code {out.returncode}")
+        duration = time.monotonic() - started
+        print(f"Test {file_name} finished with code {out.returncode} in {duration:.1f}s")
         print(stdout)
         print(stderr)
         keys_env.append(keys)
@@ -127,11 +308,24 @@ def run_openzeppelin_tests(network, jobs=8):
             f.write(stdout)
         with open(log_dirs / "stderr.log", "w") as f:
             f.write(stderr)
+        return file_name, duration
 
+    expected = lpt_makespan(estimates.values(), jobs)
+    labeler = allure.ResultsLabeler("./allure-results", OZ_EPIC_LABEL)
+    started = time.monotonic()
     pool = Pool(jobs)
-    pool.map(run_oz_file, tests)
+    durations = {}
+    for file_name, duration in pool.imap_unordered(run_oz_file, tests):
+        durations[file_name] = duration
+        labeler.scan()
     pool.close()
     pool.join()
+    makespan = time.monotonic() - started
+    save_test_durations(durations)
+    print(
+        f"Makespan: expected {expected:.0f}s, actual {makespan:.0f}s, "
+        f"sequential {sum(durations.values()):.0f}s, speedup {sum(durations.values()) / max(makespan, 1e-9):.1f}x"
+    )
     # Add allure environment
     settings = networks[network]
     web3_client = web3client.NeonWeb3Client(settings["proxy_url"], settings["network_id"])
@@ -144,16 +338,8 @@ def run_openzeppelin_tests(network, jobs=8):
         f.write("\n".join(map(lambda x: f"{x[0]}={x[1]}", opts.items())))
         f.write("\n")
     # Add epic name for allure result files
-    openzeppelin_reports = pathlib.Path("./allure-results")
-    res_file_list = [str(res_file) for res_file in openzeppelin_reports.glob("*-result.json")]
-    print("Fix allure results: {}".format(len(res_file_list)))
-
-    for res_file in res_file_list:
-        with open(res_file, "r+") as f:
-            report = json.load(f)
-        report["labels"].append({"name": "epic", "value": "OpenZeppelin contracts"})
-        with open(res_file, "w+") as f:
-            json.dump(report, f)
+    counts = labeler.finish()
+    print(f"Fix allure results: {counts}")
 
 
 def parse_openzeppelin_results():
@@ -227,7 +413,7 @@ def requirements():
 @click.option(
     "-n", "--network", default="night-stand", type=click.Choice(networks.keys()), help="In which stand run tests"
 )
-@click.option("-j", "--jobs", default=8, help="Number of parallel jobs (for openzeppelin)")
+@click.option("-j", "--jobs", default=8, help="Number of parallel jobs (for openzeppelin and basic)")
 @click.argument("name", required=True, type=click.Choice(["economy", "basic", "oz"]))
 @catch_traceback
 def run(name, network, jobs):
@@ -237,6 +423,8 @@ def run(name, network, jobs):
         command = "py.test integration/tests/economy/test_economics.py"
     elif name == "basic":
         command = "py.test integration/tests/basic"
+        if int(jobs) > 1:
+            command += f" -n {jobs} --dist loadgroup"
     elif name == "oz":
         run_openzeppelin_tests(network, jobs=int(jobs))
         shutil.copyfile("./allure/categories.json", "./allure-results/categories.json")
@@ -252,6 +440,13 @@ def run(name, network, jobs):
         sys.exit(cmd.returncode)
 
 
+@cli.command("compile", help="Compile contracts for all used solc versions into artifacts cache")
+@click.option("-v", "--version", multiple=True, help="Solc version. [default: all versions used by tests]")
+@click.option("-j", "--jobs", type=int, help="Number of compiler processes. [default: number of CPUs]")
+def compile_contracts(version, jobs):
+    precompile_contracts(version or project_solc_versions(), jobs=jobs)
+
+
 @cli.command(help="Summarize openzeppelin tests results")
 def ozreport():
     test_report, skipped_files = parse_openzeppelin_results()
@@ -306,7 +501,14 @@ def ozreport():
     default=True,
     help="Enable the web interface. " "If UI is enabled, go to http://0.0.0.0:8089/ [default: `Web UI is enabled`]",
 )
-def locust(locustfile, credentials, host, users, spawn_rate, run_time, tag, web_ui):
+@click.option(
+    "--workers",
+    default=0,
+    type=int,
+    help="Number of local worker processes, runs distributed test with master when set. "
+    "[default: one process without master]",
+)
+def locust(locustfile, credentials, host, users, spawn_rate, run_time, tag, web_ui, workers):
     """Run `Neon` pipeline performance test
 
     path it's sub-folder and file name  `loadtesting/locustfile.py`.
@@ -314,22 +516,92 @@ def locust(locustfile, credentials, host, users, spawn_rate, run_time, tag, web_
     path = pathlib.Path(__file__).parent / locustfile
     if not (path.exists() and path.is_file()):
         raise FileNotFoundError(f"path doe's not exists. {path.resolve()}")
-    command = f"locust -f {path.as_posix()} --host={host} --users={users} --spawn-rate={spawn_rate}"
+    base_command = ["locust", "-f", path.as_posix(), f"--host={host}"]
     if credentials:
-        command += f" --credentials={credentials}"
-    if run_time:
-        command += f" --run-time={run_time}"
+        base_command.append(f"--credentials={credentials}")
     if tag:
-        command += f" --tags {' '.join(tag)}"
+        base_command.extend(["--tags", *tag])
+    command = base_command + [f"--users={users}", f"--spawn-rate={spawn_rate}"]
+    if run_time:
+        command.append(f"--run-time={run_time}")
     if not web_ui:
-        command += f" --headless"
+        command.append("--headless")
 
-    cmd = subprocess.run(command, shell=True)
+    worker_processes = []
+    env = os.environ.copy()
+    if workers > 0:
+        command.extend(["--master", f"--expect-workers={workers}"])
+        env["NEON_WORKER_COUNT"] = str(workers)
+        for i in range(workers):
+            worker_env = dict(env, NEON_WORKER_INDEX=str(i))
+            worker_processes.append(
+                subprocess.Popen(base_command + ["--worker", "--master-host=127.0.0.1"], env=worker_env)
+            )
+    try:
+        cmd = subprocess.run(command, env=env)
+    finally:
+        for process in worker_processes:
+            if process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + 30
+        for process in worker_processes:
+            try:
+                process.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
 
     if cmd.returncode != 0:
         sys.exit(cmd.returncode)
 
 
+@cli.command("corpus", help="Pre-sign transactions corpus for raw replay performance test")
+@click.option(
+    "-n", "--network", default="night-stand", type=click.Choice(networks.keys()), help="In which stand run tests"
+)
+@click.option("-a", "--accounts", default=100, type=int, help="Number of funded sender accounts.", show_default=True)
+@click.option("-c", "--count", default=100, type=int, help="Transactions per account.", show_default=True)
+@click.option(
+    "-k",
+    "--kind",
+    multiple=True,
+    type=click.Choice(["send_neon", "send_erc20", "inc_account", "dec_account"]),
+    help="Transaction kinds in corpus. [default: all]",
+)
+@click.option("-o", "--output", type=str, help="Corpus file path. [default: corpus-<network>.bin]")
+@click.option("-j", "--jobs", type=int, help="Number of signing processes. [default: number of CPUs]")
+def make_corpus(network, accounts, count, kind, output, jobs):
+    """Transactions are signed with gas price of the moment, replay corpus soon after it's prepared"""
+    prepare_transactions_corpus(network, accounts_count=accounts, count=count, kinds=kind, output=output, jobs=jobs)
+
+
+@cli.command(help="Run local Neon proxy and faucet stand-in to benchmark the test harness offline")
+@click.option("-p", "--port", default=9091, type=int, help="Port to listen on.", show_default=True)
+@click.option(
+    "-l",
+    "--latency",
+    default="",
+    type=str,
+    help="Response latency distribution in ms: const:5, uniform:1,10, normal:20,5 or exp:10. [default: no latency]",
+)
+@click.option(
+    "-c",
+    "--confirmation",
+    default="",
+    type=str,
+    help="Delay before transaction receipt is available, same format as latency. [default: instant]",
+)
+@click.option("--chain-id", default=111, type=int, help="Chain id of the stand-in.", show_default=True)
+def stub(port, latency, confirmation, chain_id):
+    """Use `stub` network (envs.json) in `locust -h stub` or `run basic -n stub` to target it"""
+    server = proxy_stub.ProxyStub(chain_id, latency=latency, confirmation=confirmation).serve(port=port)
+    print(f"Proxy stand-in listens on http://127.0.0.1:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
 @cli.command(help="Download allure history")
 @click.argument("name", type=click.STRING)
 @click.option(
@@ -350,7 +622,8 @@ def get_allure_history(name: str, network: str, destination: str = "./allure-res
             runs.append(int(run_id[0]))
     if len(runs) > 0:
         print(f"Downloading allure history from build: {max(runs)}")
-        cloud.download(path / str(max(runs)) / "history", pathlib.Path(destination) / "history")
+        stats = cloud.download(path / str(max(runs)) / "history", pathlib.Path(destination) / "history")
+        print(f"Allure history: {stats}")
 
 
 @cli.command(help="Upload allure report")
@@ -363,7 +636,8 @@ def upload_allure_report(name: str, network: str, source: str = "./allure-report
     branch = os.environ.get("GITHUB_REF_NAME")
     build_id = os.environ.get("GITHUB_RUN_NUMBER")
     path = pathlib.Path(name) / network / branch
-    cloud.upload(source, path / build_id)
+    stats = cloud.upload(source, path / build_id)
+    print(f"Allure report: {stats}")
     report_url = f"http://neon-test-allure.s3-website.eu-central-1.amazonaws.com/{path / build_id}"
     with open("/tmp/index.html", "w") as f:
         f.write(
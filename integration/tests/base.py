@@ -1,6 +1,7 @@
 import pytest
 import solana.rpc.api
 
+from utils.accounts import FundedAccounts
 from utils.faucet import Faucet
 from utils.operator import Operator
 from utils.web3client import NeonWeb3Client
@@ -9,17 +10,15 @@ from utils.web3client import NeonWeb3Client
 class BaseTests:
     operator: Operator
     faucet: Faucet
+    funded_accounts: FundedAccounts
     web3_client: NeonWeb3Client
     sol_client: solana.rpc.api.Client
     sol_price: float
 
     @pytest.fixture(autouse=True)
-    def prepare(self, operator: Operator, faucet: Faucet, web3_client, sol_client):
+    def prepare(self, operator: Operator, faucet: Faucet, funded_accounts: FundedAccounts, web3_client, sol_client):
         self.operator = operator
         self.faucet = faucet
+        self.funded_accounts = funded_accounts
         self.web3_client = web3_client
         self.sol_client = sol_client
-
-    @pytest.fixture(autouse=True)
-    def prepare_account(self, prepare_account):
-        self.acc = prepare_account
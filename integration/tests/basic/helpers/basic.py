@@ -22,6 +22,9 @@ DEVNET_SENDER_KEY = "269bc1dd17e8cbfd4280a0f58d67a0ca4631a2a8debebb88b6017083fc9
 
 
 class BaseMixin(BaseTests):
+    """Sender and recipient are class attributes created once per process, so every xdist worker funds its own pair
+    and tests of different workers never see each other's balance changes
+    """
 
     json_rpc_client: JsonRpcClient = None
     _sender_account: Account = None
@@ -71,10 +74,9 @@ class BaseMixin(BaseTests):
         self, amount: int = InputData.FAUCET_1ST_REQUEST_AMOUNT.value, is_sender: bool = True
     ) -> Account:
         """Creates a new account with balance"""
-        account = self.create_account()
         if is_sender:
-            self.request_faucet_neon(account.address, amount)
-        return account
+            return self.funded_accounts.take(amount)
+        return self.create_account()
 
     # @allure.step("requesting faucet for ERC20")
     # def request_faucet_erc20(self, wallet: str, amount: int):
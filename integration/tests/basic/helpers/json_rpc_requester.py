@@ -1,37 +1,149 @@
+import contextlib
 import dataclasses
+import json
+import os
 import typing as tp
 
 import allure
 import requests
 from requests.models import Response
 
-from integration.tests.basic.model.model import JsonRpcErrorResponse, JsonRpcResponse
+from integration.tests.basic.model.model import JsonRpcErrorResponse, JsonRpcRequest, JsonRpcResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: tp.Any) -> bytes:
+    """Compact JSON, orjson is used when installed and value fits it (integers up to 64 bits)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: bytes) -> tp.Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
+TRACE = os.environ.get("JSON_RPC_TRACE", "1") != "0"
+"""Report requests and responses to allure, `JSON_RPC_TRACE=0` turns it off for throughput oriented runs
+"""
+
+TITLE_LIMIT = 200
+"""Longest request or response text put into allure step title
+"""
+
+ATTACHMENT_LIMIT = 64 * 1024
+"""Longest request or response body attached to allure step as JSON, longer bodies are cut off and attached as text
+"""
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def to_dict(payload: tp.Any) -> tp.Dict:
+    """JSON-RPC request as dict, without deep copy of plain requests"""
+    if isinstance(payload, tp.Dict):
+        return payload
+    if type(payload) is JsonRpcRequest and not any(dataclasses.is_dataclass(param) for param in payload.params):
+        return {"id": payload.id, "method": payload.method, "params": payload.params, "jsonrpc": payload.jsonrpc}
+    return dataclasses.asdict(payload)
+
+
+def preview(body: bytes, limit: int = TITLE_LIMIT) -> str:
+    text = body[:limit].decode(errors="replace")
+    return text if len(body) <= limit else f"{text}... ({len(body)} bytes)"
 
 
 class JsonRpcClient:
     """Implements simple JSON RPC client"""
 
-    def __init__(self, proxy_url: str, session: requests.Session = None):
+    def __init__(self, proxy_url: str, session: requests.Session = None, trace: bool = TRACE):
         self._url = proxy_url
         self._session = session or requests.Session()
+        self._trace = trace
+
+    def _step(self, title: str, body: bytes) -> tp.ContextManager:
+        """Allure step with short title, body is attached only when it doesn't fit the title"""
+        if not self._trace:
+            return contextlib.nullcontext()
+        step = allure.step(f"{title}: {preview(body)}")
+        if len(body) <= TITLE_LIMIT:
+            return step
+        stack = contextlib.ExitStack()
+        stack.enter_context(step)
+        if len(body) <= ATTACHMENT_LIMIT:
+            allure.attach(body, name=title, attachment_type=allure.attachment_type.JSON)
+        else:
+            allure.attach(preview(body, ATTACHMENT_LIMIT), name=title, attachment_type=allure.attachment_type.TEXT)
+        return stack
+
+    def _post(self, body: bytes) -> Response:
+        return self._session.post(self._url, data=body, headers=HEADERS)
 
     def do_call(self, payloads: tp.Any, model: tp.Any = None) -> tp.Union[JsonRpcResponse, JsonRpcErrorResponse]:
         """Implements light-weight remote procedure call (RPC) protocol."""
-        if not isinstance(payloads, tp.Dict):
-            payloads = dataclasses.asdict(payloads)
-        with allure.step(f"Request params: {payloads}"):
-            response = self._session.post(self._url, json=payloads)
-            return self._deserialize_response(response, model=model)
+        payloads = to_dict(payloads)
+        body = dumps(payloads)
+        with self._step("Request params", body):
+            response = self._post(body)
+            return self._deserialize_response(response, model=model, request_id=payloads.get("id"))
+
+    def do_batch_call(
+        self, payloads: tp.List[tp.Any], model: tp.Any = None
+    ) -> tp.List[tp.Union[JsonRpcResponse, JsonRpcErrorResponse]]:
+        """Sends requests in one JSON-RPC batch, returns responses in requests order"""
+        payloads = [to_dict(p) for p in payloads]
+        # request ids may collide, so sequence numbers are sent and original ids restored afterwards
+        body = dumps([dict(payload, id=i) for i, payload in enumerate(payloads)])
+        with self._step("Batch request params", body):
+            response = self._post(body)
+            try:
+                json_doc = loads(response.content)
+            except ValueError:
+                json_doc = {"error": {"message": f"Invalid JSON response: {response.text}"}}
+        with self._step("Batch response data", response.content):
+            if not isinstance(json_doc, tp.List):
+                return [JsonRpcErrorResponse(id=payload["id"], error=json_doc.get("error")) for payload in payloads]
+            responses: tp.List[tp.Any] = [None] * len(payloads)
+            unexpected_ids = []
+            for item in json_doc:
+                index = item.get("id") if isinstance(item, tp.Dict) else None
+                if type(index) is not int or not 0 <= index < len(payloads) or responses[index] is not None:
+                    unexpected_ids.append(index if isinstance(item, tp.Dict) else item)
+                    continue
+                item["id"] = payloads[index]["id"]
+                if "error" in item:
+                    responses[index] = JsonRpcErrorResponse(**item)
+                else:
+                    if model:
+                        item.update(dict(result=model.from_dict(item["result"])))
+                    responses[index] = JsonRpcResponse(**item)
+            for index, payload in enumerate(payloads):
+                if responses[index] is None:
+                    message = f"No response to request {index} in batch"
+                    if unexpected_ids:
+                        message = f"{message}, unexpected response ids: {unexpected_ids}"
+                    responses[index] = JsonRpcErrorResponse(id=payload["id"], error={"message": message})
+        return responses
 
-    @staticmethod
     def _deserialize_response(
-        response: Response, model: tp.Any = None
+        self, response: Response, model: tp.Any = None, request_id: tp.Any = None
     ) -> tp.Union[JsonRpcResponse, JsonRpcErrorResponse]:
         try:
-            json_doc = response.json()
-        except requests.exceptions.JSONDecodeError:
-            return JsonRpcErrorResponse()
-        with allure.step(f"Response data: {json_doc}"):
+            json_doc = loads(response.content)
+        except ValueError:
+            return JsonRpcErrorResponse(id=request_id, error={"message": f"Invalid JSON response: {response.text}"})
+        with self._step("Response data", response.content):
             if "error" in json_doc:
                 response = JsonRpcErrorResponse(**json_doc)
             else:
@@ -39,4 +151,3 @@ class JsonRpcClient:
                     json_doc.update(dict(result=model.from_dict(json_doc["result"])))
                 response = JsonRpcResponse(**json_doc)
         return response
-
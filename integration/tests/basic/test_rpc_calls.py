@@ -152,6 +152,24 @@ class TestRpcCalls(BaseMixin):
         assert self.assert_is_successful_response(actual_result), AssertMessage.WRONG_TYPE.value
         assert "0x" in actual_result.result, AssertMessage.DOES_NOT_START_WITH_0X.value
 
+    def test_batch_call(self):
+        """Verify batch of rpc calls returns responses matched to requests"""
+        payloads = [
+            RpcRequestFactory.get_gas_price(params=[]),
+            RpcRequestFactory.get_block_number(params=[]),
+            RpcRequestFactory.get_balance(params=[self.sender_account.address, Tag.LATEST.value]),
+            RpcRequestFactory.get_trx_count(params=[self.sender_account.address, Tag.LATEST.value]),
+        ]
+        responses = self.json_rpc_client.do_batch_call(payloads)
+
+        assert len(responses) == len(payloads)
+        for payload, response in zip(payloads, responses):
+            assert response.id == payload.id, AssertMessage.WRONG_ID.value
+            assert self.assert_is_successful_response(response), AssertMessage.WRONG_TYPE.value
+            assert self.is_hex(response.result)
+        assert int(responses[2].result, 16) == self.get_balance(self.sender_account.address)
+        assert self.web3_client.get_nonces([self.sender_account])[0] == int(responses[3].result, 16)
+
     @pytest.mark.parametrize("from_block,to_block", GET_LOGS_TEST_DATA)
     def test_eth_get_logs_via_tags(self, from_block: Tag, to_block: Tag):
         """Verify implemented rpc calls work eth_getLogs"""
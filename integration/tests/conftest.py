@@ -1,4 +1,5 @@
 import json
+import os
 import pathlib
 import random
 import shutil
@@ -15,12 +16,14 @@ from _pytest.config import Config
 from solana.keypair import Keypair
 
 from integration.tests.basic.helpers.json_rpc_requester import JsonRpcClient
+from utils.accounts import FundedAccounts
 from utils.erc20wrapper import ERC20Wrapper
 from utils.faucet import Faucet
 from utils.operator import Operator
 from utils.web3client import NeonWeb3Client
 
 LAMPORT_PER_SOL = 1_000_000_000
+PREPARE_ACCOUNT_AMOUNT = 5000
 
 
 @dataclass
@@ -96,6 +99,8 @@ def allure_environment(pytestconfig: Config, web3_client: NeonWeb3Client):
     allure_path = pytestconfig.getoption("--alluredir")
 
     yield opts
+    if os.environ.get("PYTEST_XDIST_WORKER", "gw0") != "gw0":
+        return
     with open(pathlib.Path() / allure_path / "environment.properties", "w+") as f:
         f.write("\n".join(map(lambda x: f"{x[0]}={x[1]}", opts.items())))
         f.write("\n")
@@ -104,29 +109,37 @@ def allure_environment(pytestconfig: Config, web3_client: NeonWeb3Client):
     shutil.copy(categories_from, categories_to)
 
 
+@pytest.fixture(scope="session")
+def funded_accounts(faucet, web3_client: NeonWeb3Client) -> FundedAccounts:
+    """Accounts funded by faucet in bulk, every account is given out once"""
+    return FundedAccounts(web3_client, faucet)
+
+
+@pytest.fixture(scope="class")
+def prepare_account(funded_accounts: FundedAccounts, web3_client: NeonWeb3Client):
+    """Create new account for tests"""
+    with allure.step(f"Create account for tests with {PREPARE_ACCOUNT_AMOUNT} NEON"):
+        acc = funded_accounts.take(PREPARE_ACCOUNT_AMOUNT)
+        assert web3_client.get_balance(acc) == PREPARE_ACCOUNT_AMOUNT
+    yield acc
+    with allure.step(f"Account end balance: {web3_client.get_balance(acc)} NEON"):
+        pass
+
+
 @pytest.fixture(scope="class")
-def prepare_account(operator, faucet, web3_client: NeonWeb3Client):
-    """Create new account for tests and save operator pre/post balances"""
-    with allure.step("Create account for tests"):
-        acc = web3_client.eth.account.create()
-    with allure.step(f"Request 5000 NEON from faucet for {acc.address}"):
-        faucet.request_neon(acc.address, 5000)
-        assert web3_client.get_balance(acc) == 5000
-    start_neon_balance = operator.get_neon_balance()
-    start_sol_balance = operator.get_solana_balance()
+def operator_balances(operator: Operator):
+    """Save operator pre/post balances of test class, has to be requested explicitly"""
+    start = operator.get_balances_snapshot()
     with allure.step(
-        f"Operator initial balance: {start_neon_balance / LAMPORT_PER_SOL} NEON {start_sol_balance / LAMPORT_PER_SOL} SOL"
+        f"Operator initial balance: {start.neon_total / LAMPORT_PER_SOL} NEON {start.solana_total / LAMPORT_PER_SOL} SOL"
     ):
         pass
-    yield acc
-    end_neon_balance = operator.get_neon_balance()
-    end_sol_balance = operator.get_solana_balance()
+    yield start
+    end = operator.get_balances_snapshot()
     with allure.step(
-        f"Operator end balance: {end_neon_balance / LAMPORT_PER_SOL} NEON {end_sol_balance / LAMPORT_PER_SOL} SOL"
+        f"Operator end balance: {end.neon_total / LAMPORT_PER_SOL} NEON {end.solana_total / LAMPORT_PER_SOL} SOL"
     ):
         pass
-    with allure.step(f"Account end balance: {web3_client.get_balance(acc)} NEON"):
-        pass
 
 
 @pytest.fixture(scope="session")
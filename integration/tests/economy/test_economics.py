@@ -34,9 +34,14 @@ def install_solcx_versions():
 
 
 @allure.story("Operator economy")
+@pytest.mark.usefixtures("operator_balances")
 class TestEconomics(BaseTests):
     acc = None
 
+    @pytest.fixture(autouse=True)
+    def prepare_account(self, prepare_account):
+        self.acc = prepare_account
+
     @pytest.fixture(autouse=True)
     def setup_sol_cost(self, sol_price):
         self.sol_price = sol_price
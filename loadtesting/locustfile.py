@@ -7,19 +7,22 @@ import string
 import sys
 import time
 import typing as tp
-import uuid
+from concurrent.futures import Future
 
+import eth_account.signers.local
 import gevent
 import requests
 import solana
 from locust import User, TaskSet, between, task, events, tag
+from locust.runners import MasterRunner, WorkerRunner
 from solana.keypair import Keypair
 from functools import lru_cache
 
 from utils import helpers
+from utils.accounts import AccountPool
 from utils.erc20wrapper import ERC20Wrapper
 from utils.faucet import Faucet
-from utils.web3client import NeonWeb3Client
+from utils.web3client import GasEstimateCache, NeonWeb3Client, ReceiptWaiter, TTLCache
 
 LOG = logging.getLogger("neon_client")
 
@@ -51,6 +54,18 @@ NEON_TOKEN_VERSION = "0.8.10"
 """Neon tokens contract version
 """
 
+ACCOUNTS_FILE = "accounts-{network}.json"
+""" Default pre-funded accounts storage
+"""
+
+RECEIPT_POLL_INTERVAL = 0.5
+"""Shortest pause between receipt waiter sweeps in seconds, it grows while sweeps find no receipts
+"""
+
+RECEIPT_TIMEOUT = 120
+"""How long the receipt waiter waits for transaction confirmation in seconds
+"""
+
 
 def init_session(size: int) -> requests.Session:
     """init request session with extended connection pool size"""
@@ -71,6 +86,83 @@ def arg_parser(parser):
         default=ENV_FILE,
         help="Relative path to environment credentials file.",
     )
+    parser.add_argument(
+        "--submit-only",
+        action="store_true",
+        env_var="NEON_SUBMIT_ONLY",
+        default=False,
+        help="Don't wait for transaction receipts in tasks, confirmations are tracked by the background poller.",
+    )
+    parser.add_argument(
+        "--tx-pipeline",
+        type=int,
+        env_var="NEON_TX_PIPELINE",
+        default=8,
+        help="Number of unconfirmed transactions one account can have in flight (with --submit-only).",
+    )
+    parser.add_argument(
+        "--metadata-ttl",
+        type=float,
+        env_var="NEON_METADATA_TTL",
+        default=10,
+        help="How long gas price, chain id and versions are cached, seconds (0 disables cache).",
+    )
+    parser.add_argument(
+        "--gas-cache-size",
+        type=int,
+        env_var="NEON_GAS_CACHE_SIZE",
+        default=1024,
+        help="Number of gas estimates cached by transaction shape (0 disables cache).",
+    )
+    parser.add_argument(
+        "--gas-multiplier",
+        type=float,
+        env_var="NEON_GAS_MULTIPLIER",
+        default=1.2,
+        help="Safety multiplier applied to cached gas estimates.",
+    )
+    parser.add_argument(
+        "--accounts-file",
+        type=str,
+        env_var="NEON_ACCOUNTS_FILE",
+        default=ACCOUNTS_FILE,
+        help="Relative path to pre-funded accounts storage, `{network}` is replaced with host name.",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        env_var="NEON_POOL_SIZE",
+        default=0,
+        help="Number of accounts funded before users spawn (default: number of users).",
+    )
+    parser.add_argument(
+        "--funding-concurrency",
+        type=int,
+        env_var="NEON_FUNDING_CONCURRENCY",
+        default=20,
+        help="Number of parallel faucet requests while funding accounts.",
+    )
+    parser.add_argument(
+        "--top-up-interval",
+        type=float,
+        env_var="NEON_TOP_UP_INTERVAL",
+        default=60,
+        help="Pause between background top ups of pool accounts in seconds (0 disables top up).",
+    )
+    parser.add_argument(
+        "--worker-index",
+        type=int,
+        env_var="NEON_WORKER_INDEX",
+        default=0,
+        help="Index of this worker process, workers use separate shards of pre-funded accounts.",
+    )
+    parser.add_argument(
+        "--worker-count",
+        type=int,
+        env_var="NEON_WORKER_COUNT",
+        default=1,
+        help="Number of worker processes sharing pre-funded accounts storage.",
+    )
 
 
 @events.test_start.add_listener
@@ -87,97 +179,243 @@ def load_credentials(environment, **kwargs):
         credentials = f.get(network, f[DEFAULT_NETWORK])
 
 
-class LocustEventHandler(object):
-    """Implements custom Locust events handler"""
+account_pool: tp.Optional[AccountPool] = None
+"""Pre-funded accounts leased by users
+"""
 
-    def __init__(self, request_event: "EventHook") -> None:
-        self.buffer: tp.Dict[str, tp.Any] = dict()
+top_up_greenlet: tp.Optional[gevent.Greenlet] = None
+
+worker_shard: tp.Tuple[int, int] = (0, 1)
+"""Accounts shard of this worker process, (index, count)
+"""
+
+
+@events.init.add_listener
+def remember_worker_shard(environment, **kwargs):
+    """Init event handler, master overrides custom options of workers with its own values when test starts"""
+    global worker_shard
+    if isinstance(environment.runner, WorkerRunner):
+        worker_shard = (environment.parsed_options.worker_index, environment.parsed_options.worker_count)
+
+
+def top_up_accounts(interval: float) -> None:
+    """Keeps pool accounts balances not empty"""
+    while True:
+        gevent.sleep(interval)
+        funded = account_pool.top_up()
+        LOG.info(f"Accounts pool: {funded} accounts topped up")
+
+
+@events.test_start.add_listener
+def prepare_account_pool(environment, **kwargs):
+    """Test start event handler, funds accounts before users spawn
+
+    Master funds accounts for all workers and spawns no users, each worker leases accounts of its own shard only.
+    """
+    global account_pool, top_up_greenlet
+    options = environment.parsed_options
+    path = pathlib.Path(__file__).parent.parent / options.accounts_file.format(network=options.host)
+    session = init_session(options.funding_concurrency)
+    shard = worker_shard if isinstance(environment.runner, WorkerRunner) else (0, 1)
+    account_pool = AccountPool(
+        NeonWeb3Client(credentials["proxy_url"], credentials["network_id"], session=session),
+        Faucet(credentials["faucet_url"], session=session),
+        path,
+        concurrency=options.funding_concurrency,
+        shard=shard,
+    )
+    size = options.pool_size or options.num_users or 0
+    LOG.info(f"Accounts pool: {len(account_pool)} accounts loaded from {path}, {size} required")
+    if shard[1] == 1:
+        funded = account_pool.fill(size)
+        LOG.info(f"Accounts pool: {funded} new accounts funded")
+    if isinstance(environment.runner, MasterRunner):
+        return
+    if options.top_up_interval > 0:
+        top_up_greenlet = gevent.spawn(top_up_accounts, options.top_up_interval)
+
+
+@events.test_stop.add_listener
+def stop_account_pool(environment, **kwargs):
+    """Test stop event handler"""
+    global top_up_greenlet
+    if top_up_greenlet is not None:
+        top_up_greenlet.kill(block=False)
+        top_up_greenlet = None
+
+
+class RequestTimer(object):
+    """Times one request and fires locust `request` event on exit, keeps no shared state"""
+
+    __slots__ = ("request_type", "name", "response", "response_length", "exception", "_request_event", "_start")
+
+    def __init__(self, request_event: "EventHook", request_type: str, name: str = "") -> None:
         self._request_event = request_event
+        self.request_type = request_type
+        self.name = name
+        self.response = None
+        self.response_length = 0
+        self.exception = None
+
+    def __enter__(self) -> "RequestTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_val is not None and not isinstance(exc_val, Exception):
+            # greenlet is killed (user is stopped), nothing to report
+            return
+        self._request_event.fire(
+            name=self.name,
+            request_type=self.request_type,
+            response=self.response,
+            response_time=(time.perf_counter() - self._start) * 1000,
+            response_length=self.response_length,
+            exception=self.exception if exc_val is None else exc_val,
+            context={},
+        )
+
+
+class ReceiptPoller(object):
+    """Reports confirmation latency of submitted transactions, receipts are waited by shared batched waiter"""
 
-    def init_event(
-        self, task_id: str, request_type: str, task_name: tp.Optional[str] = "", start_time: tp.Optional[float] = None
+    def __init__(self, request_event: "EventHook") -> None:
+        self._request_event = request_event
+        self._waiter: tp.Optional[ReceiptWaiter] = None
+
+    @property
+    def running(self) -> bool:
+        return self._waiter is not None
+
+    def start(self, waiter: ReceiptWaiter) -> None:
+        """Track transactions with the waiter, no-op if already running"""
+        if not self.running:
+            self._waiter = waiter
+
+    def stop(self) -> None:
+        """Stop the waiter and forget pending transactions"""
+        if self._waiter is not None:
+            self._waiter.stop()
+            self._waiter = None
+
+    def track(self, tx_hash: bytes, request_type: str, client: NeonWeb3Client) -> None:
+        """Report transaction when its receipt is available or waiting is timed out"""
+        future = self._waiter.submit(tx_hash)
+        future.add_done_callback(functools.partial(self._report, tx_hash, request_type, time.perf_counter(), client))
+
+    def _report(
+        self, tx_hash: bytes, request_type: str, submitted: float, client: NeonWeb3Client, future: Future
     ) -> None:
-        """Added data to buffer"""
-        params = dict(
-            name=task_name,
-            start_time=start_time or time.time(),
+        if future.cancelled():
+            # test is stopped, nothing to report but nonce pipeline slot must be freed
+            client.finish_transaction(tx_hash, None)
+            return
+        receipt = None
+        exception = future.exception()
+        if exception is None:
+            receipt = future.result()
+            if not receipt.get("status"):
+                exception = RuntimeError(f"Transaction {tx_hash.hex()} is reverted")
+        client.finish_transaction(tx_hash, receipt)
+        self._request_event.fire(
+            name="confirmed",
             request_type=request_type,
-            start_perf_counter=time.perf_counter(),
-        )
-        self.buffer[task_id] = params
-        LOG.debug("- buffer - %s" % self.buffer)
-
-    def fire_event(self, task_id: str, **kwargs) -> None:
-        """Sends event to locust ."""
-        event = self.buffer.pop(task_id)
-        total_time = (time.perf_counter() - event["start_perf_counter"]) * 1000
-        request_meta = dict(
-            name=event["name"],
-            request_type=event["request_type"],
-            response=event.get("response"),
-            response_time=total_time,
-            response_length=event.get("response_length", 0),
-            exception=event.get("exception"),
+            response=receipt,
+            response_time=(time.perf_counter() - submitted) * 1000,
+            response_length=0,
+            exception=exception,
             context={},
         )
-        self._request_event.fire(**request_meta)
-        LOG.debug("- %s : %s - %sms" % (event["request_type"], event["event_type"], total_time))
 
 
-locust_events_handler = LocustEventHandler(events.request)
+receipt_poller = ReceiptPoller(events.request)
+
+
+@events.test_stop.add_listener
+def stop_receipt_poller(environment, **kwargs):
+    """Test stop event handler"""
+    receipt_poller.stop()
+    if NeonProxyTasksSet._receipt_waiter is not None:
+        LOG.info(f"Receipt waiter statistics: {NeonProxyTasksSet._receipt_waiter.stats()}")
+        NeonProxyTasksSet._receipt_waiter.stop()
+    if NeonProxyTasksSet._metadata_cache is not None:
+        LOG.info(f"Metadata cache statistics: {NeonProxyTasksSet._metadata_cache.stats()}")
+    if NeonProxyTasksSet._gas_cache is not None:
+        LOG.info(f"Gas estimates cache statistics: {NeonProxyTasksSet._gas_cache.stats()}")
 
 
 def statistics_collector(func: tp.Callable) -> tp.Callable:
     """Handle locust events."""
+    request_type = f"`{func.__name__.replace('_', ' ')}`"
 
     @functools.wraps(func)
-    def wrap(*args, **kwargs) -> tp.Any:
-        task_id = str(uuid.uuid4())
-        request_type = f"`{func.__name__.replace('_', ' ')}`"
-        event: tp.Dict[str, tp.Any] = dict(task_id=task_id, request_type=request_type)
-        locust_events_handler.init_event(**event)
+    def wrap(self, *args, **kwargs) -> tp.Any:
         response = None
+        sender = args[0] if args and isinstance(args[0], eth_account.signers.local.LocalAccount) else None
+        if receipt_poller.running and self.nonce_manager is not None and sender is not None:
+            # waiting for pipeline slot of sender account isn't a part of submit latency
+            self.nonce_manager.reserve(sender.address)
+        else:
+            sender = None
         try:
-            response = func(*args, **kwargs)
-            event = dict(response=response, response_length=sys.getsizeof(response), event_type="success")
-        except Exception as err:
-            event = dict(event_type="failure", exception=err)
-            LOG.error(f"Web3 RPC call {request_type} is failed: {err} passed args: `{args}`, passed kwargs: `{kwargs}`")
-        locust_events_handler.buffer[task_id].update(event)
-        locust_events_handler.fire_event(task_id)
+            with RequestTimer(events.request, request_type) as timer:
+                try:
+                    response = func(self, *args, **kwargs)
+                    timer.response = response
+                    timer.response_length = sys.getsizeof(response)
+                    if receipt_poller.running and isinstance(response, bytes):
+                        # transaction was submitted without waiting for receipt
+                        timer.name = "submitted"
+                        receipt_poller.track(response, request_type, self)
+                except Exception as err:
+                    timer.exception = err
+                    LOG.error(
+                        f"Web3 RPC call {request_type} is failed: {err} passed args: `{args}`, passed kwargs: `{kwargs}`"
+                    )
+        finally:
+            if sender is not None:
+                self.nonce_manager.unreserve(sender.address)
         return response
 
     return wrap
 
 
+def instrument(cls: type) -> type:
+    """Wraps `cls.metered_methods` with statistics collector once, when class is defined"""
+    for name in cls.metered_methods:
+        setattr(cls, name, statistics_collector(getattr(cls, name)))
+    return cls
+
+
+@instrument
 class NeonWeb3ClientExt(NeonWeb3Client):
     """Extends Neon Web3 client adds statistics metrics"""
 
-    def __getattribute__(self, item):
-        ignore_list = ["create_account", "_send_transaction"]
-        try:
-            attr = object.__getattribute__(self, item)
-        except AttributeError:
-            attr = super(NeonWeb3ClientExt, self).__getattribute__(item)
-        if callable(attr) and item not in ignore_list:
-            attr = statistics_collector(attr)
-        return attr
-
-    def _send_transaction(self, *args, **kwargs) -> tp.Any:
-        """Send transaction wrapper"""
-        return super(NeonWeb3ClientExt, self).send_transaction(*args, **kwargs)
+    metered_methods: tp.Tuple[str, ...] = (
+        "get_block_number",
+        "get_balance",
+        "gas_price",
+        "send_neon",
+        "send_erc20",
+        "deploy_contract",
+        "withdraw_tokens",
+        "inc_account",
+        "dec_account",
+    )
+    """Methods reported to locust statistics, other methods cost the same as in `NeonWeb3Client`
+    """
 
     def withdraw_tokens(self, *args, **kwargs) -> tp.Any:
         """withdraw tokens wrapper"""
-        return self._send_transaction(*args, **kwargs)
+        return self.send_transaction(*args, **kwargs)
 
     def inc_account(self, *args, **kwargs) -> tp.Any:
         """Increase account wrapper"""
-        return self._send_transaction(*args, **kwargs)
+        return self.send_transaction(*args, **kwargs)
 
     def dec_account(self, *args, **kwargs) -> tp.Any:
         """Decrease account wrapper"""
-        return self._send_transaction(*args, **kwargs)
+        return self.send_transaction(*args, **kwargs)
 
 
 class NeonProxyTasksSet(TaskSet):
@@ -206,6 +444,18 @@ class NeonProxyTasksSet(TaskSet):
     """Earn Free Cryptocurrencies service
     """
 
+    _metadata_cache: tp.Optional[TTLCache] = None
+    """Cross user gas price and chain metadata cache
+    """
+
+    _gas_cache: tp.Optional[GasEstimateCache] = None
+    """Cross user gas estimates cache
+    """
+
+    _receipt_waiter: tp.Optional[ReceiptWaiter] = None
+    """Cross user batched transaction receipts waiter
+    """
+
     _last_consumer_id: int = 0
     """Last spawned user id
     """
@@ -223,8 +473,17 @@ class NeonProxyTasksSet(TaskSet):
     _web3_client: tp.Optional[NeonWeb3ClientExt] = None
 
     @staticmethod
-    def setup_class() -> None:
+    def setup_class(environment) -> None:
         """Base initialization, run once for all users"""
+        NeonProxyTasksSet._metadata_cache = TTLCache(environment.parsed_options.metadata_ttl)
+        if environment.parsed_options.gas_cache_size > 0:
+            NeonProxyTasksSet._gas_cache = GasEstimateCache(
+                environment.parsed_options.gas_cache_size, environment.parsed_options.gas_multiplier
+            )
+        receipts_client = NeonWeb3Client(credentials["proxy_url"], credentials["network_id"], session=init_session(1))
+        NeonProxyTasksSet._receipt_waiter = ReceiptWaiter(
+            receipts_client.get_receipts, min_interval=RECEIPT_POLL_INTERVAL, timeout=RECEIPT_TIMEOUT
+        )
         NeonProxyTasksSet._accounts = []
         NeonProxyTasksSet._counter_contracts = []
         NeonProxyTasksSet._erc20_contracts = {}
@@ -233,17 +492,21 @@ class NeonProxyTasksSet(TaskSet):
 
     def setup(self) -> None:
         """Prepare data requirements"""
-        # create new account for each simulating user
-        self.account = self._web3_client.create_account()
-        self.task_keeps_balance()
-        NeonProxyTasksSet._accounts.append(self.account)
+        # lease pre-funded account for each simulating user
+        self.account = account_pool.lease()
+        if self.account not in NeonProxyTasksSet._accounts:
+            NeonProxyTasksSet._accounts.append(self.account)
+
+    def on_stop(self) -> None:
+        """on_stop is called when the TaskSet is stopping"""
+        account_pool.release(self.account)
 
     def on_start(self) -> None:
         """on_start is called when a Locust start before any task is scheduled"""
         # setup class once
         with self._setup_class_locker:
             if not NeonProxyTasksSet._setup_class_done:
-                self.setup_class()
+                self.setup_class(self.user.environment)
                 NeonProxyTasksSet._setup_class_done = True
             NeonProxyTasksSet._last_consumer_id += 1
             self.neon_consumer_id = NeonProxyTasksSet._last_consumer_id
@@ -251,7 +514,18 @@ class NeonProxyTasksSet(TaskSet):
                 self.user.environment.parsed_options.num_users or self.user.environment.runner.target_user_count
             )
             self._faucet = Faucet(credentials["faucet_url"], session=session)
-            self._web3_client = NeonWeb3ClientExt(credentials["proxy_url"], credentials["network_id"], session=session)
+            self._web3_client = NeonWeb3ClientExt(
+                credentials["proxy_url"],
+                credentials["network_id"],
+                session=session,
+                submit_only=self.user.environment.parsed_options.submit_only,
+                nonce_pipeline=self.user.environment.parsed_options.tx_pipeline,
+                metadata_cache=self._metadata_cache,
+                gas_cache=self._gas_cache,
+                receipt_waiter=self._receipt_waiter,
+            )
+            if self._web3_client.submit_only:
+                receipt_poller.start(self._receipt_waiter)
 
             self._solana_client = solana.rpc.api.Client(credentials["solana_url"])
             self._erc20wrapper_client = ERC20Wrapper(
@@ -333,7 +607,7 @@ class BaseResizingTasksSet(NeonProxyTasksSet):
             tx = func().buildTransaction(
                 {
                     "from": self.account.address,
-                    "nonce": self._web3_client.eth.get_transaction_count(self.account.address),
+                    "gas": 0,
                     "gasPrice": self._web3_client.gas_price(),
                 }
             )
@@ -561,12 +835,14 @@ class WithDrawTasksSet(NeonProxyTasksSet):
             instruction_tx = contract.functions.withdraw(bytes(keys.public_key)).buildTransaction(
                 {
                     "from": self.account.address,
-                    "nonce": self._web3_client.eth.get_transaction_count(self.account.address),
+                    "gas": 0,
                     "gasPrice": self._web3_client.gas_price(),
                     "value": amount,
                 }
             )
             result = self._web3_client.withdraw_tokens(self.account, instruction_tx)
+            if self._web3_client.submit_only:
+                return
             if not (result and result.get("status")):
                 self.log.error(f"withdrawing tokens is failed, transaction result: {result}")
             return
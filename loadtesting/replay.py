@@ -0,0 +1,118 @@
+import json
+import logging
+import pathlib
+import time
+import typing as tp
+
+import gevent
+import requests
+from locust import User, constant, events, task
+from locust.exception import StopUser
+
+from utils.corpus import CorpusReader
+
+LOG = logging.getLogger("neon_replay")
+
+DEFAULT_NETWORK = "night-stand"
+"""Default test environment name
+"""
+
+ENV_FILE = "envs.json"
+""" Default environment credentials storage
+"""
+
+CORPUS_FILE = "corpus-{network}.bin"
+""" Default pre-signed transactions corpus, prepared by `./clickfile.py corpus`
+"""
+
+
+@events.init_command_line_parser.add_listener
+def arg_parser(parser):
+    """Add custom command line arguments to Locust"""
+    parser.add_argument(
+        "--credentials",
+        type=str,
+        env_var="NEON_CRED",
+        default=ENV_FILE,
+        help="Relative path to environment credentials file.",
+    )
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        env_var="NEON_CORPUS",
+        default=CORPUS_FILE,
+        help="Relative path to pre-signed transactions corpus, `{network}` is replaced with host name.",
+    )
+
+
+credentials: tp.Dict = {}
+corpus: tp.Optional[CorpusReader] = None
+
+
+@events.test_start.add_listener
+def load_corpus(environment, **kwargs):
+    """Test start event handler"""
+    global credentials, corpus
+    base_path = pathlib.Path(__file__).parent.parent
+    network = environment.parsed_options.host
+    path = base_path / environment.parsed_options.credentials
+    if not (path.exists() and path.is_file()):
+        path = base_path / ENV_FILE
+    with open(path, "r") as fp:
+        f = json.load(fp)
+        credentials = f.get(network, f[DEFAULT_NETWORK])
+    corpus = CorpusReader(base_path / environment.parsed_options.corpus.format(network=network))
+    LOG.info(f"Corpus: {len(corpus)} pre-signed transactions loaded")
+
+
+@events.test_stop.add_listener
+def close_corpus(environment, **kwargs):
+    """Test stop event handler"""
+    global corpus
+    if corpus is not None:
+        LOG.info(f"Corpus: {corpus.position} of {len(corpus)} transactions replayed")
+        corpus.close()
+        corpus = None
+
+
+class RawReplayUser(User):
+    """Sends pre-signed transactions with `eth_sendRawTransaction` only, measures proxy raw ingest ceiling
+
+    Records are taken in corpus order, so every account nonces go in sequence. Test stops when corpus is exhausted.
+    """
+
+    wait_time = constant(0)
+
+    def on_start(self) -> None:
+        self._session = requests.Session()
+        self._url = credentials["proxy_url"]
+
+    @task
+    def task_send_raw_transaction(self) -> None:
+        """Send next pre-signed transaction"""
+        record = corpus.next() if corpus is not None else None
+        if record is None:
+            LOG.info("Corpus is exhausted, stopping test")
+            gevent.spawn(self.environment.runner.quit)
+            raise StopUser()
+        kind, raw = record
+        payload = {"jsonrpc": "2.0", "method": "eth_sendRawTransaction", "params": ["0x" + raw.hex()], "id": 0}
+        response = None
+        exception = None
+        start = time.perf_counter()
+        try:
+            response = self._session.post(self._url, json=payload)
+            error = response.json().get("error")
+            if error:
+                exception = RuntimeError(error.get("message", error))
+        except Exception as err:
+            exception = err
+        self.environment.events.request.fire(
+            name=kind,
+            request_type="`send raw transaction`",
+            response=response,
+            response_time=(time.perf_counter() - start) * 1000,
+            response_length=len(response.content) if response is not None else 0,
+            exception=exception,
+            context={},
+        )
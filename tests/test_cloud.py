@@ -0,0 +1,114 @@
+import hashlib
+import pathlib
+import threading
+
+import pytest
+
+from utils import cloud
+
+MB = 1024 * 1024
+
+
+def s3_etag(data: bytes, part_size: int = 8 * MB) -> str:
+    """ETag S3 computes for upload with default transfer config"""
+    if len(data) < part_size:
+        return hashlib.md5(data).hexdigest()
+    parts = [hashlib.md5(data[i : i + part_size]).digest() for i in range(0, len(data), part_size)]
+    return f"{hashlib.md5(b''.join(parts)).hexdigest()}-{len(parts)}"
+
+
+class FakeS3:
+    """Bucket in memory with `list_objects_v2` paginator, upload and download of boto3 S3 client"""
+
+    def __init__(self, page_size: int = 2):
+        self.page_size = page_size
+        self.objects = {}
+        self.uploaded = []
+        self.downloaded = []
+        self._lock = threading.Lock()
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        if not keys:
+            yield {"KeyCount": 0}
+        for i in range(0, len(keys), self.page_size):
+            yield {
+                "Contents": [
+                    {"Key": key, "Size": len(self.objects[key]), "ETag": f'"{s3_etag(self.objects[key])}"'}
+                    for key in keys[i : i + self.page_size]
+                ]
+            }
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None):
+        data = pathlib.Path(Filename).read_bytes()
+        with self._lock:
+            self.objects[Key] = data
+            self.uploaded.append(Key)
+
+    def download_file(self, Bucket, Key, Filename, Config=None):
+        pathlib.Path(Filename).write_bytes(self.objects[Key])
+        with self._lock:
+            self.downloaded.append(Key)
+
+
+@pytest.fixture
+def bucket(monkeypatch) -> FakeS3:
+    fake = FakeS3()
+    monkeypatch.setattr(cloud, "client", fake)
+    return fake
+
+
+def test_upload_skips_unchanged_files(bucket, tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "sub" / "b.json").write_text('{"b": 1}')
+    (tmp_path / "c.bin").write_bytes(b"\0" * 100)
+
+    assert cloud.upload(tmp_path, "run/1") == cloud.SyncStats(3, 1 + 8 + 100, 0)
+    assert sorted(bucket.uploaded) == ["run/1/a.txt", "run/1/c.bin", "run/1/sub/b.json"]
+
+    bucket.uploaded.clear()
+    assert cloud.upload(tmp_path, "run/1") == cloud.SyncStats(0, 0, 3)
+    assert bucket.uploaded == []
+
+    # same size, different content is detected by ETag
+    (tmp_path / "sub" / "b.json").write_text('{"b": 2}')
+    (tmp_path / "d.txt").write_text("d")
+    assert cloud.upload(tmp_path, "run/1") == cloud.SyncStats(2, 8 + 1, 2)
+    assert sorted(bucket.uploaded) == ["run/1/d.txt", "run/1/sub/b.json"]
+
+
+def test_upload_single_file(bucket, tmp_path):
+    path = tmp_path / "report.html"
+    path.write_text("<html/>")
+    assert cloud.upload(path, "run/1") == cloud.SyncStats(1, 7, 0)
+    assert cloud.upload(path, "run/1") == cloud.SyncStats(0, 0, 1)
+    assert bucket.uploaded == ["run/1/report.html"]
+
+
+def test_multipart_etag(bucket, tmp_path):
+    path = tmp_path / "big.bin"
+    data = bytes(range(256)) * (9 * MB // 256)
+    path.write_bytes(data)
+
+    assert cloud.etag(path) == s3_etag(data)
+    assert cloud.etag(path).endswith("-2")
+    assert cloud.upload(tmp_path, "run/1").files == 1
+    assert cloud.upload(tmp_path, "run/1") == cloud.SyncStats(0, 0, 1)
+
+
+def test_download_skips_unchanged_files(bucket, tmp_path):
+    bucket.objects = {"run/1/a.txt": b"a", "run/1/sub/b.json": b'{"b": 1}', "run/1/c.bin": b"c", "run/2/d.txt": b"d"}
+
+    assert cloud.download("run/1", tmp_path) == cloud.SyncStats(3, 1 + 8 + 1, 0)
+    assert (tmp_path / "sub" / "b.json").read_bytes() == b'{"b": 1}'
+
+    bucket.downloaded.clear()
+    (tmp_path / "a.txt").write_text("x")
+    assert cloud.download("run/1", tmp_path) == cloud.SyncStats(1, 1, 2)
+    assert bucket.downloaded == ["run/1/a.txt"]
+    assert (tmp_path / "a.txt").read_text() == "a"
@@ -0,0 +1,154 @@
+import collections
+import json
+import pathlib
+import threading
+import typing as tp
+
+import eth_account
+import eth_account.signers.local
+
+from utils import helpers
+from utils.faucet import Faucet
+from utils.web3client import NeonWeb3Client
+
+
+class AccountPool:
+    """Funded accounts stored in a local file and reused across runs
+
+    Accounts are created and funded ahead of time with bounded concurrency, users lease them
+    and give back when finished. `top_up` funds accounts which balance dropped below `min_balance`.
+    `shard` is (index, count) pair, sharded pool takes every `count`-th account of the file starting with `index`,
+    so processes sharing the file never use the same account. Sharded pool doesn't write the file,
+    it has to be filled by one process beforehand.
+    """
+
+    def __init__(
+        self,
+        web3_client: NeonWeb3Client,
+        faucet: Faucet,
+        path: tp.Union[str, pathlib.Path],
+        amount: int = 1000,
+        min_balance: int = 100,
+        concurrency: int = 10,
+        shard: tp.Tuple[int, int] = (0, 1),
+    ):
+        self._web3_client = web3_client
+        self._faucet = faucet
+        self._path = pathlib.Path(path)
+        self._amount = amount
+        self._min_balance = min_balance
+        self._concurrency = concurrency
+        self._shard_index, self._shard_count = shard
+        self._lock = threading.Lock()
+        self._accounts: tp.List[eth_account.signers.local.LocalAccount] = []
+        self._free: tp.Deque[eth_account.signers.local.LocalAccount] = collections.deque()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    @property
+    def accounts(self) -> tp.List[eth_account.signers.local.LocalAccount]:
+        return list(self._accounts)
+
+    def _load(self) -> None:
+        if not self._path.exists():
+            return
+        with open(self._path, "r") as f:
+            keys = json.load(f)
+        keys = keys[self._shard_index :: self._shard_count]
+        self._accounts = [eth_account.Account.from_key(key) for key in keys]
+        self._free.extend(self._accounts)
+
+    def _save(self) -> None:
+        """Write keys to temporary file and replace the pool file, so other runs never see half written file"""
+        if self._shard_count > 1:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with helpers.atomic_write(self._path) as f:
+            json.dump([account.key.hex() for account in self._accounts], f)
+
+    def _map(self, func: tp.Callable, items: tp.List) -> tp.List:
+        return helpers.thread_map(func, items, self._concurrency)
+
+    def _fund(self, account: eth_account.signers.local.LocalAccount) -> bool:
+        try:
+            self._faucet.request_neon(account.address, self._amount)
+        except (AssertionError, IOError):
+            return False
+        return True
+
+    def _add(self, accounts: tp.List[eth_account.signers.local.LocalAccount], leased: bool = False) -> None:
+        with self._lock:
+            self._accounts.extend(accounts)
+            if not leased:
+                self._free.extend(accounts)
+            self._save()
+
+    def fill(self, size: int) -> int:
+        """Create and fund accounts until pool has `size` accounts, returns number of new accounts"""
+        accounts = [self._web3_client.create_account() for _ in range(size - len(self._accounts))]
+        funded = [account for account, ok in zip(accounts, self._map(self._fund, accounts)) if ok]
+        if funded:
+            self._add(funded)
+        return len(funded)
+
+    def lease(self) -> eth_account.signers.local.LocalAccount:
+        """Take a free account, creates and funds a new one if pool is exhausted"""
+        with self._lock:
+            if self._free:
+                return self._free.popleft()
+        account = self._web3_client.create_account()
+        self._faucet.request_neon(account.address, self._amount)
+        self._add([account], leased=True)
+        return account
+
+    def release(self, account: eth_account.signers.local.LocalAccount) -> None:
+        """Give leased account back to pool"""
+        with self._lock:
+            self._free.append(account)
+
+    def top_up(self) -> int:
+        """Fund accounts which balance is below `min_balance`, returns number of funded accounts"""
+        accounts = self.accounts
+        balances = self._web3_client.get_balances(accounts)
+        low = [account for account, balance in zip(accounts, balances) if balance < self._min_balance]
+        return sum(self._map(self._fund, low))
+
+
+class FundedAccounts:
+    """Accounts funded by faucet in bulk batches and given out only once, for tests which check exact balances
+
+    Accounts are funded on demand: the first batch of every amount has one account and each next batch
+    doubles up to `batch_size`, so amounts requested once don't fund accounts nobody uses.
+    """
+
+    def __init__(self, web3_client: NeonWeb3Client, faucet: Faucet, batch_size: int = 8):
+        self._web3_client = web3_client
+        self._faucet = faucet
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._free: tp.Dict[int, tp.Deque[eth_account.signers.local.LocalAccount]] = collections.defaultdict(
+            collections.deque
+        )
+        self._next_batch: tp.Dict[int, int] = collections.defaultdict(lambda: 1)
+
+    def fill(self, amount: int, count: int) -> None:
+        """Fund `count` new accounts with `amount` in one bulk faucet run"""
+        accounts = [self._web3_client.create_account() for _ in range(count)]
+        results = self._faucet.request_neon_bulk([(account.address, amount) for account in accounts])
+        failed = [result for result in results if not result.ok]
+        assert not failed, f"Faucet failed to fund {len(failed)} of {len(accounts)} accounts: {failed[0]}"
+        with self._lock:
+            self._free[amount].extend(accounts)
+
+    def take(self, amount: int) -> eth_account.signers.local.LocalAccount:
+        """Account with `amount` balance, funds next batch when there are no free ones"""
+        with self._lock:
+            if self._free[amount]:
+                return self._free[amount].popleft()
+            count = self._next_batch[amount]
+            self._next_batch[amount] = min(count * 2, self._batch_size)
+        self.fill(amount, count)
+        with self._lock:
+            return self._free[amount].popleft()
@@ -0,0 +1,75 @@
+import json
+import multiprocessing
+import multiprocessing.pool
+import pathlib
+import typing as tp
+
+from utils import helpers
+
+RESULT_GLOB = "*-result.json"
+
+LABELED, UNCHANGED, INCOMPLETE = "labeled", "unchanged", "incomplete"
+"""Outcomes of `add_label`
+"""
+
+
+def add_label(path: str, label: tp.Dict[str, str]) -> str:
+    """Add label to allure result file with atomic replace, runs in worker process
+
+    File which already has the label is left as is, file which can't be parsed is probably still being written.
+    """
+    try:
+        with open(path, "r") as f:
+            report = json.load(f)
+    except ValueError:
+        return INCOMPLETE
+    labels = report.setdefault("labels", [])
+    if label in labels:
+        return UNCHANGED
+    labels.append(label)
+    with helpers.atomic_write(path) as f:
+        json.dump(report, f)
+    return LABELED
+
+
+class ResultsLabeler:
+    """Adds label to allure result files in process pool while they keep appearing in directory"""
+
+    def __init__(self, directory: tp.Union[str, pathlib.Path], label: tp.Dict[str, str], processes=None):
+        self._directory = pathlib.Path(directory)
+        self._label = label
+        self._pool = multiprocessing.Pool(processes)
+        self._pending: tp.List[tp.Tuple[tp.List[str], multiprocessing.pool.AsyncResult]] = []
+        self._seen: tp.Set[str] = set()
+        self.counts = {LABELED: 0, UNCHANGED: 0, INCOMPLETE: 0}
+
+    def _collect(self, wait: bool = False) -> None:
+        pending = []
+        for paths, result in self._pending:
+            if not wait and not result.ready():
+                pending.append((paths, result))
+                continue
+            for path, outcome in zip(paths, result.get()):
+                if outcome == INCOMPLETE:
+                    self._seen.discard(path)
+                else:
+                    self.counts[outcome] += 1
+        self._pending = pending
+
+    def scan(self) -> None:
+        """Queue result files which appeared since last scan, doesn't wait for them"""
+        self._collect()
+        paths = [str(path) for path in self._directory.glob(RESULT_GLOB) if str(path) not in self._seen]
+        if paths:
+            self._seen.update(paths)
+            self._pending.append((paths, self._pool.starmap_async(add_label, [(path, self._label) for path in paths])))
+
+    def finish(self) -> tp.Dict[str, int]:
+        """Label all remaining files and stop pool, returns number of files by outcome"""
+        self._collect(wait=True)
+        self.scan()
+        self._collect(wait=True)
+        self._pool.close()
+        self._pool.join()
+        self.counts[INCOMPLETE] = len(list(self._directory.glob(RESULT_GLOB))) - len(self._seen)
+        return self.counts
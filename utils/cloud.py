@@ -1,41 +1,106 @@
+import hashlib
 import os
 import boto3
 import pathlib
 import mimetypes
+import typing as tp
+
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+from utils import helpers
 
 NEON_TESTS_BUCKET_NAME = os.environ.get("AWS_S3_BUCKET", "neon-test-allure")
 
+CONCURRENCY = int(os.environ.get("AWS_S3_CONCURRENCY", 16))
+"""Parallel transfers of upload and download
+"""
+
+TRANSFER_CONFIG = TransferConfig(use_threads=False)
+"""Files are transferred in parallel, so every single file goes in one thread, multipart threshold and chunk size
+are used to compute ETag of local files
+"""
+
+
+client = boto3.client(
+    "s3",
+    region_name=os.environ.get("AWS_REGION", "eu-central-1"),
+    endpoint_url=os.environ.get("AWS_S3_ENDPOINT_URL") or None,
+    config=Config(max_pool_connections=CONCURRENCY),
+)
+
+
+class SyncStats(tp.NamedTuple):
+    files: int
+    bytes: int
+    skipped: int
 
-client = boto3.client("s3", region_name=os.environ.get("AWS_REGION", "eu-central-1"))
+    def __str__(self) -> str:
+        return f"{self.files} files ({self.bytes} bytes) transferred, {self.skipped} unchanged"
 
 
-def download(source, destination, bucket=NEON_TESTS_BUCKET_NAME):
-    files = list_bucket(source, bucket)
-    for f in files:
-        dst_file = pathlib.Path(destination) / f["Key"].split(str(source))[1][1:]
-        if not dst_file.parent.exists():
-            dst_file.parent.mkdir(parents=True)
-        client.download_file(bucket, f["Key"], str(dst_file))
+def etag(path: pathlib.Path, config: TransferConfig = TRANSFER_CONFIG) -> str:
+    """ETag S3 gives to file uploaded with `config`: MD5 of content or MD5 of part MD5s for multipart upload"""
+    digests = []
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(config.multipart_chunksize), b""):
+            digests.append(hashlib.md5(chunk))
+    if path.stat().st_size < config.multipart_threshold:
+        return digests[0].hexdigest() if digests else hashlib.md5().hexdigest()
+    return f"{hashlib.md5(b''.join(d.digest() for d in digests)).hexdigest()}-{len(digests)}"
 
 
-def upload(source, destination, bucket=NEON_TESTS_BUCKET_NAME):
+def is_same(path: pathlib.Path, obj: tp.Optional[tp.Dict]) -> bool:
+    """Local file has size and ETag of bucket object"""
+    if obj is None or not path.is_file() or path.stat().st_size != obj["Size"]:
+        return False
+    return etag(path) == obj["ETag"].strip('"')
+
+
+def download(source, destination, bucket=NEON_TESTS_BUCKET_NAME) -> SyncStats:
+    """Download every object under `source` prefix which isn't already in `destination` directory"""
+    tasks = []
+    objects = list_bucket(source, bucket)
+    for obj in objects:
+        dst_file = pathlib.Path(destination) / obj["Key"].split(str(source))[1][1:]
+        if not is_same(dst_file, obj):
+            tasks.append((obj, dst_file))
+
+    def transfer(task):
+        obj, dst_file = task
+        dst_file.parent.mkdir(parents=True, exist_ok=True)
+        client.download_file(bucket, obj["Key"], str(dst_file), Config=TRANSFER_CONFIG)
+
+    helpers.thread_map(transfer, tasks, CONCURRENCY)
+    return SyncStats(len(tasks), sum(obj["Size"] for obj, _ in tasks), len(objects) - len(tasks))
+
+
+def upload(source, destination, bucket=NEON_TESTS_BUCKET_NAME) -> SyncStats:
+    """Upload `source` file or every file of `source` directory which isn't already under `destination` prefix"""
     source = pathlib.Path(source)
     destination = pathlib.Path(destination)
 
     if source.is_file():
-        mimetype = mimetypes.guess_type(source.name)[0]
-        client.upload_file(str(source), bucket, str(destination / source.name), ExtraArgs={"ContentType": mimetype})
-        return
+        files = {str(destination / source.name): source}
+        prefix = str(destination / source.name)
+    else:
+        files = {str(destination / f.relative_to(source)): f for f in source.glob("**/*") if f.is_file()}
+        prefix = f"{destination}/"
+    objects = {obj["Key"]: obj for obj in list_bucket(prefix, bucket)}
+    tasks = [(key, path) for key, path in files.items() if not is_same(path, objects.get(key))]
+
+    def transfer(task):
+        key, path = task
+        mimetype = mimetypes.guess_type(path.name)[0]
+        extra_args = {"ContentType": mimetype} if mimetype else {}
+        client.upload_file(str(path), bucket, key, ExtraArgs=extra_args, Config=TRANSFER_CONFIG)
 
-    for f in source.glob("**/*"):
-        if not f.is_file():
-            continue
-        mimetype = mimetypes.guess_type(f.name)[0]
-        client.upload_file(
-            str(f), bucket, str(destination / f.relative_to(source)), ExtraArgs={"ContentType": mimetype}
-        )
+    helpers.thread_map(transfer, tasks, CONCURRENCY)
+    return SyncStats(len(tasks), sum(path.stat().st_size for _, path in tasks), len(files) - len(tasks))
 
 
 def list_bucket(directory, bucket=NEON_TESTS_BUCKET_NAME):
-    result = client.list_objects_v2(Bucket=bucket, Prefix=str(directory))
-    return result.get("Contents", [])
+    paginator = client.get_paginator("list_objects_v2")
+    return [
+        obj for page in paginator.paginate(Bucket=bucket, Prefix=str(directory)) for obj in page.get("Contents", [])
+    ]
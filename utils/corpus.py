@@ -0,0 +1,83 @@
+import mmap
+import pathlib
+import struct
+import typing as tp
+
+import eth_account
+
+from utils import helpers
+
+MAGIC = b"NTXC"
+VERSION = 1
+
+HEADER = struct.Struct(">4sBI")
+"""magic, format version, number of records
+"""
+
+RECORD = struct.Struct(">BH")
+"""transaction kind index, raw transaction length, followed by raw transaction bytes
+"""
+
+KINDS = ("send_neon", "send_erc20", "inc_account", "dec_account")
+"""Transaction kinds in corpus, record stores index in this tuple
+"""
+
+
+def sign_transactions(args: tp.Tuple[str, tp.List[tp.Tuple[str, tp.Dict]]]) -> tp.List[tp.Tuple[str, bytes]]:
+    """Sign (kind, transaction) pairs with private key, runs in worker process"""
+    key, transactions = args
+    account = eth_account.Account.from_key(key)
+    return [(kind, bytes(account.sign_transaction(transaction).rawTransaction)) for kind, transaction in transactions]
+
+
+def interleave(per_account: tp.List[tp.List[tp.Tuple[str, bytes]]]) -> tp.Iterator[tp.Tuple[str, bytes]]:
+    """Round robin over accounts, so transactions of every account are replayed in nonce order"""
+    for i in range(max(map(len, per_account), default=0)):
+        for transactions in per_account:
+            if i < len(transactions):
+                yield transactions[i]
+
+
+def write_corpus(path: tp.Union[str, pathlib.Path], records: tp.Iterable[tp.Tuple[str, bytes]]) -> int:
+    """Write records to temporary file and replace corpus file, returns number of records"""
+    count = 0
+    with helpers.atomic_write(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0))
+        for kind, raw in records:
+            f.write(RECORD.pack(KINDS.index(kind), len(raw)))
+            f.write(raw)
+            count += 1
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, count))
+    return count
+
+
+class CorpusReader:
+    """Memory mapped corpus, gives records one by one to all users of the process"""
+
+    def __init__(self, path: tp.Union[str, pathlib.Path]):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} isn't transactions corpus of version {VERSION}")
+        self._offset = HEADER.size
+        self.position = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def next(self) -> tp.Optional[tp.Tuple[str, bytes]]:
+        """Next (kind, raw transaction) record, None when corpus is exhausted"""
+        if self.position >= self._count:
+            return None
+        kind, length = RECORD.unpack_from(self._mmap, self._offset)
+        start = self._offset + RECORD.size
+        self._offset = start + length
+        self.position += 1
+        return KINDS[kind], self._mmap[start : self._offset]
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
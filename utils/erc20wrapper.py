@@ -1,10 +1,13 @@
+import collections
 import pathlib
 import struct
+import threading
+import typing as tp
+from multiprocessing import Pool
 
-import solcx
 import spl.token.client
 import solana.rpc.api
-from solana.rpc.types import TxOpts
+from solana.rpc.types import DataSliceOpts, TxOpts
 from solana.keypair import Keypair
 from solana.publickey import PublicKey
 import eth_account.signers.local
@@ -17,6 +20,7 @@ from spl.token.instructions import get_associated_token_address, create_associat
 from solana.sysvar import SYSVAR_RENT_PUBKEY
 from solana.transaction import Transaction, TransactionInstruction, AccountMeta
 
+from . import helpers
 from . import web3client
 
 
@@ -33,21 +37,104 @@ def create_account_layout(ether, nonce):
     ))
 
 
+def _find_program_address(args: tp.Tuple[tp.Tuple[bytes, ...], str]) -> tp.Tuple[bytes, int]:
+    seeds, program_id = args
+    address, nonce = PublicKey.find_program_address(list(seeds), PublicKey(program_id))
+    return bytes(address), nonce
+
+
+class ProgramAddressCache:
+    """Bounded LRU memo of `PublicKey.find_program_address`
+
+    Derivation searches bump seeds with repeated sha256 and curve checks, while the result depends only
+    on seeds and program id. `find_many` derives misses in a process pool when there are at least
+    `bulk_threshold` of them.
+    """
+
+    def __init__(self, size: int = 65536, bulk_threshold: int = 256):
+        self._size = size
+        self._bulk_threshold = bulk_threshold
+        self._lock = threading.Lock()
+        self._values: tp.OrderedDict[tuple, tp.Tuple[PublicKey, int]] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: tuple) -> tp.Optional[tp.Tuple[PublicKey, int]]:
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def _set(self, key: tuple, value: tp.Tuple[PublicKey, int]) -> None:
+        with self._lock:
+            self._values[key] = value
+            if len(self._values) > self._size:
+                self._values.popitem(last=False)
+
+    def find(self, seeds: tp.Sequence[bytes], program_id) -> tp.Tuple[PublicKey, int]:
+        key = (tuple(bytes(seed) for seed in seeds), str(program_id))
+        value = self._get(key)
+        if value is None:
+            address, nonce = _find_program_address(key)
+            value = (PublicKey(address), nonce)
+            self._set(key, value)
+        return value
+
+    def find_many(
+        self, seeds_list: tp.Iterable[tp.Sequence[bytes]], program_id, processes: tp.Optional[int] = None
+    ) -> tp.List[tp.Tuple[PublicKey, int]]:
+        """Derive addresses for many seeds in one call, in seeds order"""
+        keys = [(tuple(bytes(seed) for seed in seeds), str(program_id)) for seeds in seeds_list]
+        values = [self._get(key) for key in keys]
+        missed = list({key: None for key, value in zip(keys, values) if value is None})
+        if len(missed) >= self._bulk_threshold:
+            with Pool(processes) as pool:
+                derived = pool.map(_find_program_address, missed, chunksize=64)
+        else:
+            derived = [_find_program_address(key) for key in missed]
+        found = {key: (PublicKey(address), nonce) for key, (address, nonce) in zip(missed, derived)}
+        for key, value in found.items():
+            self._set(key, value)
+        return [value if value is not None else found[key] for key, value in zip(keys, values)]
+
+    def stats(self) -> tp.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._values)}
+
+
+program_addresses = ProgramAddressCache()
+"""Derived addresses shared by all wrappers of the process
+"""
+
+
 class ERC20Wrapper:
-    def __init__(self,
-                 web3_client: web3client.NeonWeb3Client,
-                 sol_client: solana.rpc.api.Client,
-                 evm_loader_address,
-                 neon_token_mint
-                 ):
+    def __init__(
+        self,
+        web3_client: web3client.NeonWeb3Client,
+        sol_client: solana.rpc.api.Client,
+        evm_loader_address,
+        neon_token_mint,
+        pda_cache: tp.Optional[ProgramAddressCache] = None,
+    ):
         self.web3_client = web3_client
         self.sol_client = sol_client
         self.evm_loader = evm_loader_address
         self.neon_token_mint = neon_token_mint
+        self.pda_cache = pda_cache or program_addresses
 
     def eth_to_solana_address(self, eth_account_address: str) -> (PublicKey, int):
         eth_account_addressbytes = bytes.fromhex(eth_account_address[2:])
-        return PublicKey.find_program_address([b"\1", eth_account_addressbytes], PublicKey(self.evm_loader))
+        return self.pda_cache.find([b"\1", eth_account_addressbytes], self.evm_loader)
+
+    def eth_to_solana_addresses(
+        self, eth_account_addresses: tp.Iterable[str], processes: tp.Optional[int] = None
+    ) -> tp.List[tp.Tuple[PublicKey, int]]:
+        """Bulk `eth_to_solana_address` for account provisioning"""
+        seeds_list = [[b"\1", bytes.fromhex(address[2:])] for address in eth_account_addresses]
+        return self.pda_cache.find_many(seeds_list, self.evm_loader, processes=processes)
 
     def get_wrapped_token_account_address(self, eth_account_address: str, token_mint, erc20_contract_address) -> PublicKey:
         eth_contract_address_bytes = bytes.fromhex(erc20_contract_address[2:])
@@ -56,14 +143,21 @@ class ERC20Wrapper:
                  bytes(token_mint),
                  eth_contract_address_bytes,
                  eth_account_address_bytes]
-        return PublicKey.find_program_address(seeds, PublicKey(self.evm_loader))[0]
+        return self.pda_cache.find(seeds, self.evm_loader)[0]
 
     def is_account_exist(self, acc: PublicKey):
-        acc_info_resp = self.sol_client.get_account_info(acc, Commitment("confirmed"))
-        if acc_info_resp.get('result', None) is None:
-            raise RuntimeError(f'Failed to retrieve account {acc}')
+        return self.are_accounts_exist([acc])[0]
 
-        return not acc_info_resp['result'].get('value', None) is None
+    def get_accounts_info(
+        self, accounts: tp.Sequence[PublicKey], data_slice: tp.Optional[DataSliceOpts] = None
+    ) -> tp.List[tp.Optional[tp.Dict]]:
+        """Accounts info in one `getMultipleAccounts` request per 100 accounts, None for not existing accounts"""
+        return helpers.get_multiple_accounts(self.sol_client, accounts, Commitment("confirmed"), data_slice)
+
+    def are_accounts_exist(self, accounts: tp.Sequence[PublicKey]) -> tp.List[bool]:
+        """Existence of accounts, data isn't requested"""
+        infos = self.get_accounts_info(accounts, data_slice=DataSliceOpts(offset=0, length=0))
+        return [info is not None for info in infos]
 
     def create_spl(self, owner: Keypair, decimals: int = 9):
         token_mint = spl.token.client.Token.create_mint(
@@ -90,7 +184,6 @@ class ERC20Wrapper:
                        account: eth_account.signers.local.LocalAccount,
                        mint_address
                        ):
-        solcx.install_solc("0.8.10")
         contract_path = (
                 pathlib.Path.cwd() / "contracts" / "erc20wrapper.sol"
         ).absolute()
@@ -100,7 +193,7 @@ class ERC20Wrapper:
 
         source = source.replace("Awesome Token", name).replace("AWST", symbol)
 
-        compiled = solcx.compile_source(source, output_values=["abi", "bin"], solc_version="0.8.10")
+        compiled = helpers.compile_source(source, "0.8.10")
         contract_interface = compiled[list(compiled.keys())[0]]
 
         contract_deploy_tx = self.web3_client.deploy_contract(
@@ -121,8 +214,10 @@ class ERC20Wrapper:
         source_token_acc = get_associated_token_address(solana_owner.public_key, mint_address)
         trx = Transaction()
         neon_acc, nonce = self.eth_to_solana_address(to_address)
+        dest_token_account = self.get_wrapped_token_account_address(to_address, mint_address, wrapped_contract)
+        neon_acc_exists, dest_token_account_exists = self.are_accounts_exist([neon_acc, dest_token_account])
 
-        if not self.is_account_exist(neon_acc):
+        if not neon_acc_exists:
             trx.add(TransactionInstruction(
                 program_id=self.evm_loader,
                 data=create_account_layout(bytes.fromhex(to_address[2:]), nonce),
@@ -132,8 +227,7 @@ class ERC20Wrapper:
                     AccountMeta(pubkey=neon_acc, is_signer=False, is_writable=True),
                 ]))
 
-        dest_token_account = self.get_wrapped_token_account_address(to_address, mint_address, wrapped_contract)
-        if not self.is_account_exist(dest_token_account):
+        if not dest_token_account_exists:
             trx.add(TransactionInstruction(
                 program_id=self.evm_loader,
                 data=bytes.fromhex('0F'),
@@ -172,7 +266,7 @@ class ERC20Wrapper:
         with open(contract_path, "r") as s:
             source = s.read()
 
-        compiled = solcx.compile_source(source, output_values=["abi", "bin"], solc_version="0.8.10")
+        compiled = helpers.compile_source(source, "0.8.10")
         contract_interface = compiled[list(compiled.keys())[0]]
 
         contract = self.web3_client.eth.contract(
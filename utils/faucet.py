@@ -1,16 +1,91 @@
+import random
+import threading
+import time
 import typing as tp
 import urllib.parse
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils import helpers
+
+
+class FundingResult(tp.NamedTuple):
+    """Outcome of one bulk funding request"""
+
+    address: str
+    amount: int
+    status_code: tp.Optional[int]
+    attempts: int
+    error: tp.Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
 
 
 class Faucet:
-    def __init__(self, faucet_url: str, session: tp.Optional[tp.Any] = None):
+    def __init__(
+        self,
+        faucet_url: str,
+        session: tp.Optional[tp.Any] = None,
+        concurrency: int = 8,
+        rate: float = 20,
+        retries: int = 5,
+        backoff: float = 0.5,
+    ):
+        """`rate` limits bulk requests per second, failed bulk requests are retried after random pause
+        up to `backoff * 2 ** attempt` seconds
+        """
         self._url = faucet_url
-        self._session = session or requests.Session()
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self._session = session
+        self._concurrency = concurrency
+        self._interval = 1 / rate if rate else 0
+        self._retries = retries
+        self._backoff = backoff
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
 
     def request_neon(self, address: str, amount: int = 100):
         assert address.startswith("0x")
         url = urllib.parse.urljoin(self._url, "request_neon")
         resp = self._session.post(url, json={"amount": amount, "wallet": address})
         assert resp.status_code == 200, resp.text
+
+    def _wait_slot(self) -> None:
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _fund(self, request: tp.Tuple[str, int]) -> FundingResult:
+        address, amount = request
+        url = urllib.parse.urljoin(self._url, "request_neon")
+        status_code, error = None, None
+        for attempt in range(1, self._retries + 1):
+            self._wait_slot()
+            try:
+                resp = self._session.post(url, json={"amount": amount, "wallet": address})
+                status_code, error = resp.status_code, None if resp.status_code == 200 else resp.text
+            except requests.RequestException as e:
+                status_code, error = None, str(e)
+            if status_code == 200 or attempt == self._retries:
+                break
+            time.sleep(random.uniform(0, self._backoff * 2 ** (attempt - 1)))
+        return FundingResult(address, amount, status_code, attempt, error)
+
+    def request_neon_bulk(self, funding: tp.Iterable[tp.Tuple[str, int]]) -> tp.List[FundingResult]:
+        """Fund (address, amount) pairs concurrently, returns results in the same order
+
+        An address may be repeated to fund it more than one request amount.
+        """
+        funding = list(funding)
+        for address, _ in funding:
+            assert address.startswith("0x")
+        return helpers.thread_map(self._fund, funding, self._concurrency)
@@ -4,10 +4,88 @@ Created on 2022-03-15
 @author: Eugeny Kurkovich
 """
 
+import contextlib
+import hashlib
+import json
+import os
 import pathlib
+import re
+import secrets
+import threading
+import typing as tp
+from multiprocessing.dummy import Pool
 
 import solcx
 
+ARTIFACTS_CACHE = pathlib.Path(os.environ.get("NEON_ARTIFACTS_CACHE", pathlib.Path.cwd() / ".artifacts"))
+"""Compiled contracts storage shared by all processes, file name is hash of sources, solc version and outputs
+"""
+
+OUTPUT_VALUES = ("abi", "bin")
+
+IMPORT_RE = re.compile(r"^\s*import\s+(?:[^'\"]*\sfrom\s+)?['\"]([^'\"]+)['\"]", re.MULTILINE)
+
+MAX_MULTIPLE_ACCOUNTS = 100
+"""Solana RPC limit of accounts in one `getMultipleAccounts` request
+"""
+
+_artifacts: tp.Dict[str, tp.Dict] = {}
+_artifact_locks: tp.Dict[str, threading.Lock] = {}
+_artifact_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def atomic_write(path: tp.Union[str, pathlib.Path], mode: str = "w") -> tp.Iterator[tp.IO]:
+    """Write to unique temporary file next to `path` and replace `path` with it on success
+
+    Readers never see half written file, concurrent writers (processes and threads) don't share temporary file,
+    the last replace wins.
+    """
+    path = pathlib.Path(path)
+    while True:
+        tmp_path = path.parent / f".{path.name}.{secrets.token_hex(8)}.tmp"
+        try:
+            # created like `open` does, with 0o666 limited by process umask
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def thread_map(func: tp.Callable, items: tp.Iterable, concurrency: int) -> tp.List:
+    """`func` results of items in order, computed in at most `concurrency` threads"""
+    items = list(items)
+    if not items:
+        return []
+    pool = Pool(min(concurrency, len(items)))
+    try:
+        return pool.map(func, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def get_multiple_accounts(
+    sol_client, accounts: tp.Sequence, commitment: str = "confirmed", data_slice=None
+) -> tp.List[tp.Optional[tp.Dict]]:
+    """Accounts info in one `getMultipleAccounts` request per 100 accounts, None for not existing accounts"""
+    infos = []
+    for i in range(0, len(accounts), MAX_MULTIPLE_ACCOUNTS):
+        chunk = list(accounts[i : i + MAX_MULTIPLE_ACCOUNTS])
+        resp = sol_client.get_multiple_accounts(chunk, commitment, data_slice=data_slice)
+        if resp.get("result", None) is None:
+            raise RuntimeError(f"Failed to retrieve accounts {chunk}: {resp.get('error')}")
+        infos.extend(resp["result"]["value"])
+    return infos
+
 
 def get_contract_abi(name, compiled):
     for key in compiled.keys():
@@ -15,17 +93,94 @@ def get_contract_abi(name, compiled):
             return compiled[key]
 
 
+def install_solc(version: str):
+    if version not in [str(v) for v in solcx.get_installed_solc_versions()]:
+        solcx.install_solc(version)
+
+
+def _update_sources_digest(digest, source: str, base_path: pathlib.Path, seen: tp.Set[pathlib.Path]):
+    """Hash source with all local files it imports"""
+    digest.update(source.encode())
+    for name in IMPORT_RE.findall(source):
+        path = (base_path / name).resolve()
+        if path in seen or not path.is_file():
+            continue
+        seen.add(path)
+        _update_sources_digest(digest, path.read_text(), path.parent, seen)
+
+
+def artifact_key(source: str, version: str, base_path: pathlib.Path, output_values=OUTPUT_VALUES) -> str:
+    digest = hashlib.sha256(f"{version}:{','.join(sorted(output_values))}\n".encode())
+    _update_sources_digest(digest, source, base_path, set())
+    return digest.hexdigest()
+
+
+def compile_cached(key: str, compile_func: tp.Callable[[], tp.Dict]) -> tp.Dict:
+    """Compiler output from memory, then from cache file, compiles only when both miss
+
+    Concurrent callers in one process wait for the first one instead of running the compiler too.
+    """
+    compiled = _artifacts.get(key)
+    if compiled is not None:
+        return compiled
+    with _artifact_locks_guard:
+        lock = _artifact_locks.setdefault(key, threading.Lock())
+    with lock:
+        compiled = _artifacts.get(key)
+        if compiled is not None:
+            return compiled
+        path = ARTIFACTS_CACHE / f"{key}.json"
+        try:
+            with open(path, "r") as f:
+                compiled = json.load(f)
+        except (IOError, ValueError):
+            compiled = compile_func()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(path) as f:
+                json.dump(compiled, f)
+        _artifacts[key] = compiled
+    return compiled
+
+
+def compile_source(source: str, version: str, base_path: tp.Optional[pathlib.Path] = None, output_values=OUTPUT_VALUES):
+    """Cached `solcx.compile_source`"""
+    base_path = base_path or pathlib.Path.cwd() / "contracts"
+
+    def compile_func():
+        install_solc(version)
+        return solcx.compile_source(source, output_values=list(output_values), solc_version=version)
+
+    return compile_cached(artifact_key(source, version, base_path, output_values), compile_func)
+
+
+def compile_file(contract_path: pathlib.Path, version: str) -> tp.Dict:
+    """Cached `solcx.compile_files` for one file"""
+
+    def compile_func():
+        install_solc(version)
+        return solcx.compile_files([contract_path], output_values=list(OUTPUT_VALUES), solc_version=version)
+
+    return compile_cached(artifact_key(contract_path.read_text(), version, contract_path.parent), compile_func)
+
+
+def precompile_file(contract_path: pathlib.Path, version: str) -> tp.Optional[str]:
+    """Put compiled file into artifacts cache, returns compiler error instead of raising it (runs in pool)"""
+    try:
+        compile_file(contract_path, version)
+    except solcx.exceptions.SolcError as e:
+        return (e.stderr_data or str(e)).strip().splitlines()[0]
+    return None
+
+
 def get_contract_interface(contract_name: str, version: str):
     if contract_name.endswith(".sol"):
         contract_name = contract_name.rsplit(".", 1)[0]
 
-    if version not in [str(v) for v in solcx.get_installed_solc_versions()]:
-        solcx.install_solc(version)
     contract_path = (pathlib.Path.cwd() / "contracts" / f"{contract_name}.sol").absolute()
 
     assert contract_path.exists()
 
-    compiled = solcx.compile_files([contract_path], output_values=["abi", "bin"], solc_version=version)
+    compiled = compile_file(contract_path, version)
     contract_interface = get_contract_abi(contract_name, compiled)
 
     return contract_interface
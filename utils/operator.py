@@ -1,13 +1,69 @@
+import base64
+import struct
 import time
+import types
 import typing as tp
+from decimal import Decimal
 
 import web3
 import solana.rpc.api
 from solana.rpc.commitment import Confirmed
-from solana.rpc.types import TokenAccountOpts
+from solana.rpc.types import DataSliceOpts, TokenAccountOpts
 
+from utils import helpers
 from utils.web3client import NeonWeb3Client
 
+TOKEN_AMOUNT_SLICE = DataSliceOpts(offset=64, length=8)
+"""SPL token account amount field (u64 after mint and owner public keys)
+"""
+
+WAIT_BACKOFF = (0.25, 5, 2)
+"""First pause, longest pause in seconds and multiplier between balance reads while waiting for change
+"""
+
+
+class BalanceDiff(tp.NamedTuple):
+    """Balance changes per account between two snapshots"""
+
+    elapsed: float
+    solana: tp.Mapping[str, int]
+    neon: tp.Mapping[str, tp.Union[int, Decimal]]
+
+    @property
+    def solana_total(self) -> int:
+        return sum(self.solana.values())
+
+    @property
+    def neon_total(self) -> tp.Union[int, Decimal]:
+        return sum(self.neon.values())
+
+
+class BalanceSnapshot(tp.NamedTuple):
+    """Operator balances per account at `timestamp`, SOL in lamports, NEON in units of `Operator.get_neon_balance`"""
+
+    timestamp: float
+    solana: tp.Mapping[str, int]
+    neon: tp.Mapping[str, tp.Union[int, Decimal]]
+
+    @property
+    def solana_total(self) -> int:
+        return sum(self.solana.values())
+
+    @property
+    def neon_total(self) -> tp.Union[int, Decimal]:
+        return sum(self.neon.values())
+
+    def diff(self, before: "BalanceSnapshot") -> BalanceDiff:
+        """Changes since `before` snapshot"""
+        return BalanceDiff(
+            elapsed=self.timestamp - before.timestamp,
+            solana=types.MappingProxyType({k: v - before.solana.get(k, 0) for k, v in self.solana.items()}),
+            neon=types.MappingProxyType({k: v - before.neon.get(k, 0) for k, v in self.neon.items()}),
+        )
+
+    def __sub__(self, before: "BalanceSnapshot") -> BalanceDiff:
+        return self.diff(before)
+
 
 class Operator:
     def __init__(
@@ -29,49 +85,101 @@ class Operator:
         self.web3 = web3_client
         self.sol = solana.rpc.api.Client(self._solana_url)
 
-    def get_solana_balance(self):
-        balances = []
+    def get_solana_balances(self) -> tp.Dict[str, int]:
+        """Lamports of every operator key in one `getMultipleAccounts` request"""
+        keys = list(self._operator_keys)
+        infos = helpers.get_multiple_accounts(self.sol, keys, Confirmed, DataSliceOpts(offset=0, length=0))
+        return {key: info["lamports"] if info else 0 for key, info in zip(keys, infos)}
+
+    def get_neon_balances(self) -> tp.Dict[str, tp.Union[int, Decimal]]:
+        """NEON of reward addresses in one JSON-RPC batch, or operator token accounts in one `getMultipleAccounts`"""
+        if len(self._operator_neon_rewards_address) > 0:
+            addresses = [self.web3.toChecksumAddress(addr.lower()) for addr in self._operator_neon_rewards_address]
+            return dict(zip(addresses, self.web3.get_balances(addresses)))
         for key in self._operator_keys:
-            balances.append(self.sol.get_balance(key, commitment=Confirmed)["result"]["value"])
-        return sum(balances)
+            if self._operator_keys[key] is None:
+                accounts = self.sol.get_token_accounts_by_owner(key, TokenAccountOpts(mint=self._neon_token_mint))
+                self._operator_keys[key] = accounts["result"]["value"][0]["pubkey"]
+        token_accounts = list(self._operator_keys.values())
+        infos = helpers.get_multiple_accounts(self.sol, token_accounts, Confirmed, TOKEN_AMOUNT_SLICE)
+        return {
+            account: struct.unpack("<Q", base64.b64decode(info["data"][0]))[0] if info else 0
+            for account, info in zip(token_accounts, infos)
+        }
+
+    def get_balances_snapshot(self) -> BalanceSnapshot:
+        """All operator SOL and NEON balances in two round trips"""
+        return BalanceSnapshot(
+            timestamp=time.time(),
+            solana=types.MappingProxyType(self.get_solana_balances()),
+            neon=types.MappingProxyType(self.get_neon_balances()),
+        )
+
+    def get_solana_balance(self):
+        return sum(self.get_solana_balances().values())
 
     def get_neon_balance(self):
-        balances = []
-        if len(self._operator_neon_rewards_address) > 0:
-            for addr in self._operator_neon_rewards_address:
-                balances.append(
-                    self.web3.get_balance(
-                        self.web3.toChecksumAddress(addr.lower())
-                    )
-                )
-        else:
-            for key in self._operator_keys:
-                if self._operator_keys[key] is None:
-                    accounts = self.sol.get_token_accounts_by_owner(
-                        key, TokenAccountOpts(mint=self._neon_token_mint)
-                    )
-                    self._operator_keys[key] = accounts["result"]["value"][0]["pubkey"]
-                balances.append(int(self.sol.get_token_account_balance(self._operator_keys[key], commitment=Confirmed)["result"]["value"]["amount"]))
-        return sum(balances)
+        return sum(self.get_neon_balances().values())
+
+    @staticmethod
+    def _poll(
+        read: tp.Callable, changed: tp.Callable, timeout: float, interval: float, max_interval: float, backoff: float
+    ) -> tp.Tuple[tp.Any, float]:
+        """Read until `changed(value)` with exponentially growing pauses, returns value and elapsed seconds"""
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            value = read()
+            now = time.monotonic()
+            if changed(value):
+                return value, now - started
+            if now >= deadline:
+                raise TimeoutError
+            time.sleep(min(interval, deadline - now))
+            interval = min(interval * backoff, max_interval)
+
+    def wait_balances_changed(
+        self, before: BalanceSnapshot, timeout=90, solana=True, neon=True, backoff=WAIT_BACKOFF
+    ) -> BalanceSnapshot:
+        """Wait until SOL or NEON balance of any account differs from `before` snapshot
+
+        Unread side is copied from `before`, time the change took to appear is `(result - before).elapsed`.
+        """
+
+        def read():
+            return BalanceSnapshot(
+                timestamp=time.time(),
+                solana=types.MappingProxyType(self.get_solana_balances()) if solana else before.solana,
+                neon=types.MappingProxyType(self.get_neon_balances()) if neon else before.neon,
+            )
+
+        try:
+            snapshot, _ = self._poll(
+                read,
+                lambda value: value.solana != before.solana or value.neon != before.neon,
+                timeout,
+                *backoff,
+            )
+        except TimeoutError:
+            raise TimeoutError(f"Operator balances didn't change for {timeout} seconds") from None
+        return snapshot
 
     def wait_solana_balance_changed(self, current_balance, timeout=90):
         """solana change balance only when blocks confirmed"""
-        started = time.time()
-
-        while (time.time() - started) < timeout:
-            balance = self.get_solana_balance()
-            if balance != current_balance:
-                return balance
-            time.sleep(5)
-        raise TimeoutError(f"Operator solana balance didn't change for {timeout} seconds")
+        try:
+            balance, _ = self._poll(
+                self.get_solana_balance, lambda value: value != current_balance, timeout, *WAIT_BACKOFF
+            )
+        except TimeoutError:
+            raise TimeoutError(f"Operator solana balance didn't change for {timeout} seconds") from None
+        return balance
 
     def wait_neon_balance_changed(self, current_balance, timeout=90):
         """solana change balance only when blocks confirmed"""
-        started = time.time()
-
-        while (time.time() - started) < timeout:
-            balance = self.get_neon_balance()
-            if balance != current_balance:
-                return balance
-            time.sleep(5)
-        raise TimeoutError(f"Operator neon balance didn't change for {timeout} seconds")
\ No newline at end of file
+        try:
+            balance, _ = self._poll(
+                self.get_neon_balance, lambda value: value != current_balance, timeout, *WAIT_BACKOFF
+            )
+        except TimeoutError:
+            raise TimeoutError(f"Operator neon balance didn't change for {timeout} seconds") from None
+        return balance
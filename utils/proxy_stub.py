@@ -0,0 +1,348 @@
+import json
+import logging
+import random
+import threading
+import time
+import typing as tp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import eth_account
+import rlp
+import web3
+from eth_account._utils.legacy_transactions import Transaction
+from hexbytes import HexBytes
+
+LOG = logging.getLogger("proxy_stub")
+
+PROXY_VERSION = "Neon-proxy/stub"
+GAS_PRICE = 1_000_000_000
+TRANSFER_GAS = 21_000
+CALL_GAS = 100_000
+BLOCK_GAS_LIMIT = 50_000_000
+FAUCET_PATH = "/request_neon"
+ZERO_HASH = "0x" + "00" * 32
+
+
+class Latency:
+    """Latency distribution in milliseconds parsed from `kind:args` spec
+
+    `const:5`, `uniform:1,10`, `normal:20,5` (mean, deviation), `exp:10` (mean), `0` or empty spec is no latency.
+    """
+
+    KINDS = {
+        "const": lambda value: value,
+        "uniform": random.uniform,
+        "normal": random.gauss,
+        "exp": lambda mean: random.expovariate(1 / mean),
+    }
+
+    def __init__(self, spec: str = ""):
+        self.spec = spec
+        kind, _, args = (spec or "const:0").partition(":")
+        if kind not in self.KINDS:
+            kind, args = "const", kind
+        self._sample = self.KINDS[kind]
+        self._args = [float(arg) for arg in args.split(",") if arg]
+
+    def sample(self) -> float:
+        """Random delay in seconds"""
+        return max(self._sample(*self._args), 0) / 1000
+
+    def __repr__(self) -> str:
+        return f"Latency({self.spec!r})"
+
+
+class RpcError(Exception):
+    def __init__(self, message: str, code: int = -32000):
+        super().__init__(message)
+        self.code = code
+
+
+def block_hash(number: int) -> str:
+    return web3.Web3.keccak(number.to_bytes(32, "big")).hex()
+
+
+def parse_hash(value: str) -> str:
+    """32 bytes hash parameter in canonical form, `ValueError` for anything else"""
+    data = HexBytes(value)
+    if not isinstance(value, str) or len(data) != 32:
+        raise ValueError(f"invalid hash {value!r}")
+    return data.hex()
+
+
+def parse_index(value: tp.Any) -> tp.Optional[int]:
+    """Transaction index parameter, None when it isn't a quantity"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.startswith("0x"):
+        return int(value, 16)
+    return None
+
+
+class ChainState:
+    """In memory accounts, transactions and receipts, every transaction is mined in its own block"""
+
+    def __init__(self, chain_id: int, confirmation: Latency):
+        self.chain_id = chain_id
+        self._confirmation = confirmation
+        self._lock = threading.Lock()
+        self.balances: tp.Dict[str, int] = {}
+        self.nonces: tp.Dict[str, int] = {}
+        self.codes: tp.Dict[str, bytes] = {}
+        self.transactions: tp.Dict[str, tp.Dict] = {}
+        self.receipts: tp.Dict[str, tp.Tuple[float, tp.Dict]] = {}
+        self.blocks: tp.Dict[int, tp.Tuple[int, str, int]] = {}
+        self.block_numbers: tp.Dict[str, int] = {}
+        self.block_number = 1
+
+    def credit(self, address: str, amount: int) -> None:
+        with self._lock:
+            self.balances[address.lower()] = self.balances.get(address.lower(), 0) + amount
+
+    def balance(self, address: str) -> int:
+        return self.balances.get(address.lower(), 0)
+
+    def nonce(self, address: str) -> int:
+        return self.nonces.get(address.lower(), 0)
+
+    def code(self, address: str) -> bytes:
+        return self.codes.get(address.lower(), b"")
+
+    def parse_block(self, value: tp.Any) -> int:
+        """Block number of a tag or quantity parameter, `ValueError` for anything else"""
+        if value in ("latest", "pending"):
+            return self.block_number
+        if value == "earliest":
+            return 0
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str) and value.startswith("0x"):
+            return int(value, 16)
+        raise ValueError(f"invalid block {value!r}")
+
+    def block(self, number: int, full: bool = False) -> tp.Optional[tp.Dict]:
+        """Block with its only transaction, blocks without transactions are empty"""
+        if not 0 <= number <= self.block_number:
+            return None
+        timestamp, tx_hash, gas_used = self.blocks.get(number, (0, None, 0))
+        transactions = [] if tx_hash is None else [self.transactions[tx_hash] if full else tx_hash]
+        return {
+            "number": hex(number),
+            "hash": block_hash(number),
+            "parentHash": block_hash(number - 1) if number else ZERO_HASH,
+            "gasLimit": hex(BLOCK_GAS_LIMIT),
+            "gasUsed": hex(gas_used),
+            "timestamp": hex(timestamp),
+            "transactions": transactions,
+        }
+
+    def block_by_hash(self, value: str, full: bool = False) -> tp.Optional[tp.Dict]:
+        number = self.block_numbers.get(parse_hash(value))
+        return None if number is None else self.block(number, full)
+
+    def block_transaction(self, block: tp.Optional[tp.Dict], index: tp.Any) -> tp.Optional[tp.Dict]:
+        if block is None or parse_index(index) != 0 or not block["transactions"]:
+            return None
+        return self.transactions[block["transactions"][0]]
+
+    def logs(self, log_filter: tp.Dict) -> tp.List:
+        """Transactions don't emit events, so only the filter is checked"""
+        for key in ("fromBlock", "toBlock", "from_block", "to_block"):
+            if log_filter.get(key) is not None:
+                self.parse_block(log_filter[key])
+        return []
+
+    def receipt(self, tx_hash: str) -> tp.Optional[tp.Dict]:
+        confirmed_at, receipt = self.receipts.get(tx_hash.lower(), (None, None))
+        if confirmed_at is None or confirmed_at > time.monotonic():
+            return None
+        return receipt
+
+    def send_raw_transaction(self, raw: HexBytes) -> str:
+        if raw and raw[0] <= 0x7F:
+            raise RpcError("typed transactions aren't supported")
+        tx = Transaction.from_bytes(raw)
+        sender = eth_account.Account.recover_transaction(raw).lower()
+        tx_hash = web3.Web3.keccak(raw).hex()
+        to = HexBytes(tx.to).hex() if tx.to else None
+        with self._lock:
+            expected = self.nonces.get(sender, 0)
+            if tx.nonce < expected:
+                raise RpcError(f"nonce too low: address {sender}, tx: {tx.nonce} state: {expected}")
+            if tx.nonce > expected:
+                raise RpcError(f"nonce too high: address {sender}, tx: {tx.nonce} state: {expected}")
+            gas_used = TRANSFER_GAS if to and not tx.data else min(tx.gas, CALL_GAS)
+            cost = tx.value + gas_used * tx.gasPrice
+            if self.balances.get(sender, 0) < cost:
+                raise RpcError(f"insufficient funds for transfer: address {sender}")
+            self.balances[sender] -= cost
+            self.nonces[sender] = expected + 1
+            contract_address = None
+            if to is None:
+                contract_address = HexBytes(web3.Web3.keccak(rlp.encode([HexBytes(sender), tx.nonce]))[12:]).hex()
+                self.codes[contract_address] = tx.data
+                to_address = contract_address
+            else:
+                to_address = to
+            self.balances[to_address] = self.balances.get(to_address, 0) + tx.value
+            self.block_number += 1
+            tx_block_hash = block_hash(self.block_number)
+            transaction = {
+                "hash": tx_hash,
+                "nonce": hex(tx.nonce),
+                "blockHash": tx_block_hash,
+                "blockNumber": hex(self.block_number),
+                "transactionIndex": "0x0",
+                "from": sender,
+                "to": to,
+                "value": hex(tx.value),
+                "gas": hex(tx.gas),
+                "gasPrice": hex(tx.gasPrice),
+                "input": HexBytes(tx.data).hex(),
+                "v": hex(tx.v),
+                "r": hex(tx.r),
+                "s": hex(tx.s),
+            }
+            receipt = {
+                "transactionHash": tx_hash,
+                "transactionIndex": "0x0",
+                "blockHash": tx_block_hash,
+                "blockNumber": hex(self.block_number),
+                "from": sender,
+                "to": to,
+                "cumulativeGasUsed": hex(gas_used),
+                "gasUsed": hex(gas_used),
+                "contractAddress": contract_address,
+                "logs": [],
+                "logsBloom": "0x" + "00" * 256,
+                "status": "0x1",
+            }
+            self.transactions[tx_hash] = transaction
+            self.blocks[self.block_number] = (int(time.time()), tx_hash, gas_used)
+            self.block_numbers[tx_block_hash] = self.block_number
+            self.receipts[tx_hash] = (time.monotonic() + self._confirmation.sample(), receipt)
+        return tx_hash
+
+
+class ProxyStub:
+    """JSON-RPC methods used by the suite over in memory chain state"""
+
+    def __init__(self, chain_id: int = 111, latency: str = "", confirmation: str = ""):
+        self.latency = Latency(latency)
+        self.state = ChainState(chain_id, Latency(confirmation))
+        self.methods: tp.Dict[str, tp.Callable] = {
+            "eth_chainId": lambda: hex(self.state.chain_id),
+            "net_version": lambda: str(self.state.chain_id),
+            "eth_gasPrice": lambda: hex(GAS_PRICE),
+            "eth_blockNumber": lambda: hex(self.state.block_number),
+            "eth_getBalance": lambda address, block="latest": hex(self.state.balance(address)),
+            "eth_getTransactionCount": lambda address, block="latest": hex(self.state.nonce(address)),
+            "eth_getCode": lambda address, block="latest": HexBytes(self.state.code(address)).hex(),
+            "eth_estimateGas": self.estimate_gas,
+            "eth_call": self.eth_call,
+            "eth_sendRawTransaction": lambda raw: self.state.send_raw_transaction(HexBytes(raw)),
+            "eth_getTransactionReceipt": lambda tx_hash: self.state.receipt(tx_hash),
+            "eth_getTransactionByHash": lambda tx_hash: self.state.transactions.get(tx_hash.lower()),
+            "eth_getStorageAt": lambda address, position, block="latest": ZERO_HASH,
+            "eth_getLogs": lambda log_filter: self.state.logs(log_filter),
+            "eth_getBlockByNumber": lambda block, full: self.state.block(self.state.parse_block(block), full),
+            "eth_getBlockByHash": lambda value, full: self.state.block_by_hash(value, full),
+            "eth_getBlockTransactionCountByNumber": lambda block: self.transaction_count(
+                self.state.block(self.state.parse_block(block))
+            ),
+            "eth_getBlockTransactionCountByHash": lambda value: self.transaction_count(self.state.block_by_hash(value)),
+            "eth_getTransactionByBlockNumberAndIndex": lambda block, index: self.state.block_transaction(
+                self.state.block(self.state.parse_block(block)), index
+            ),
+            "eth_getTransactionByBlockHashAndIndex": lambda value, index: self.state.block_transaction(
+                self.state.block_by_hash(value), index
+            ),
+            "eth_syncing": lambda: {"startingBlock": 0, "currentBlock": self.state.block_number, "highestBlock": 0},
+            "eth_mining": lambda: False,
+            "eth_hashrate": lambda: "0x0",
+            "eth_getWork": lambda: [ZERO_HASH, ZERO_HASH, ZERO_HASH],
+            "net_peerCount": lambda: "0x0",
+            # Neon proxy returns the digest without 0x prefix
+            "web3_sha3": lambda data: web3.Web3.keccak(hexstr=data).hex()[2:],
+            "neon_proxy_version": lambda: PROXY_VERSION,
+            "neon_cli_version": lambda: PROXY_VERSION,
+            "web3_clientVersion": lambda: PROXY_VERSION,
+        }
+
+    def eth_call(self, transaction: tp.Dict, block: str = "latest") -> str:
+        """Empty result for accounts without code, zero word for contracts"""
+        if not transaction.get("to"):
+            raise RpcError("eth_call requires `to` address", -32602)
+        return ZERO_HASH if self.state.code(transaction["to"]) else "0x"
+
+    @staticmethod
+    def transaction_count(block: tp.Optional[tp.Dict]) -> str:
+        return hex(len(block["transactions"]) if block else 0)
+
+    @staticmethod
+    def estimate_gas(transaction: tp.Dict, block: str = "latest") -> str:
+        if transaction.get("to") and transaction.get("data", "0x") in ("", "0x"):
+            return hex(TRANSFER_GAS)
+        return hex(CALL_GAS)
+
+    def call(self, request: tp.Dict) -> tp.Dict:
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        method = self.methods.get(request.get("method"))
+        if method is None:
+            response["error"] = {"code": -32601, "message": f"method {request.get('method')} is not supported"}
+            return response
+        try:
+            response["result"] = method(*request.get("params", []))
+        except RpcError as err:
+            response["error"] = {"code": err.code, "message": str(err)}
+        except (TypeError, ValueError, rlp.DecodingError) as err:
+            response["error"] = {"code": -32602, "message": f"invalid params: {err}"}
+        return response
+
+    def handle(self, payload: tp.Any) -> tp.Any:
+        time.sleep(self.latency.sample())
+        if isinstance(payload, list):
+            return [self.call(request) for request in payload]
+        return self.call(payload)
+
+    def request_neon(self, payload: tp.Dict) -> None:
+        time.sleep(self.latency.sample())
+        self.state.credit(payload["wallet"], web3.Web3.toWei(payload["amount"], "ether"))
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9091) -> ThreadingHTTPServer:
+        """Create HTTP server for proxy JSON-RPC (any path) and faucet `request_neon` endpoint"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    payload = json.loads(body)
+                    if self.path.rstrip("/").endswith(FAUCET_PATH):
+                        stub.request_neon(payload)
+                        response = {}
+                    else:
+                        response = stub.handle(payload)
+                    status = 200
+                except (ValueError, KeyError) as err:
+                    response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": str(err)}}
+                    status = 400
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                LOG.debug(format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
@@ -1,44 +1,427 @@
+import collections
+import concurrent.futures
+import functools
+import threading
+import time
 import typing as tp
 from decimal import Decimal
 
+import hexbytes
 import web3
 import web3.types
 import requests
 import eth_account.signers.local
+from web3._utils.method_formatters import get_result_formatters
+
+
+NONCE_ERRORS = ("nonce too low", "nonce too high")
+
+CACHED_RPC_METHODS = (
+    "eth_chainId",
+    "eth_gasPrice",
+    "net_version",
+    "web3_clientVersion",
+    "neon_proxy_version",
+    "neon_cli_version",
+)
+
+
+class TTLCache:
+    """Time based cache for slow-changing proxy values (gas price, chain id, versions)"""
+
+    def __init__(self, ttl: float, methods: tp.Iterable[str] = CACHED_RPC_METHODS):
+        self.ttl = ttl
+        self.methods = frozenset(methods)
+        self.hits = 0
+        self.misses = 0
+        self._values: tp.Dict[str, tp.Tuple[float, tp.Any]] = {}
+
+    def get(self, key: str) -> tp.Any:
+        item = self._values.get(key)
+        if item is not None and time.monotonic() - item[0] < self.ttl:
+            self.hits += 1
+            return item[1]
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: tp.Any) -> None:
+        if self.ttl > 0:
+            self._values[key] = (time.monotonic(), value)
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def stats(self) -> tp.Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._values)}
+
+
+class GasEstimateCache:
+    """LRU cache of gas estimates keyed by transaction shape
+
+    Shape is the recipient address (or init code hash for deployments), 4-byte function selector,
+    calldata length class and whether the transaction transfers value. Cached estimates are
+    multiplied by `multiplier` and dropped when a transaction with them runs out of gas.
+    """
+
+    def __init__(self, size: int = 1024, multiplier: float = 1.2):
+        self._size = size
+        self._multiplier = multiplier
+        self._lock = threading.Lock()
+        self._values: tp.OrderedDict[tuple, int] = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(transaction) -> tuple:
+        data = hexbytes.HexBytes(transaction.get("data") or b"")
+        to = transaction.get("to")
+        if to:
+            return to.lower(), bytes(data[:4]), len(data).bit_length(), bool(transaction.get("value"))
+        return web3.Web3.keccak(data), b"", len(data).bit_length(), bool(transaction.get("value"))
+
+    def estimate(self, transaction, estimate_gas: tp.Callable) -> int:
+        key = self.key(transaction)
+        with self._lock:
+            gas = self._values.get(key)
+            if gas is not None:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return gas
+            self.misses += 1
+        gas = int(estimate_gas(transaction) * self._multiplier)
+        with self._lock:
+            self._values[key] = gas
+            if len(self._values) > self._size:
+                self._values.popitem(last=False)
+        return gas
+
+    def invalidate(self, transaction) -> None:
+        with self._lock:
+            if self._values.pop(self.key(transaction), None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> tp.Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self._values),
+        }
+
+
+def cache_middleware(cache: TTLCache) -> tp.Callable:
+    """Web3 middleware which serves `cache.methods` requests without params from cache"""
+
+    def middleware(make_request, w3):
+        def middleware_fn(method, params):
+            if method not in cache.methods or params:
+                return make_request(method, params)
+            response = cache.get(method)
+            if response is None:
+                response = make_request(method, params)
+                if "error" not in response:
+                    cache.set(method, response)
+            return response
+
+        return middleware_fn
+
+    return middleware
+
+
+class _AccountNonce:
+    """Nonce state of one account"""
+
+    __slots__ = ("lock", "slots", "value", "outstanding", "reserved", "updated")
+
+    def __init__(self, pipeline: int):
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(pipeline)
+        self.value: tp.Optional[int] = None
+        self.outstanding = 0
+        self.reserved = 0
+        self.updated = 0.0
+
+
+class NonceManager:
+    """Keeps transaction nonces per account locally
+
+    Nonce is requested from proxy on the first transaction of account, after `nonce too low/high` errors
+    and when account was idle longer than `timeout` seconds. `pipeline` is the number of transactions
+    which one account can have in flight, `acquire` blocks until one of them is released.
+    Safe for threads and for greenlets (threading is patched by gevent in locust).
+    """
+
+    def __init__(self, fetch_nonce: tp.Callable[[str], int], pipeline: int = 1, timeout: float = 60):
+        self._fetch_nonce = fetch_nonce
+        self._pipeline = pipeline
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._accounts: tp.Dict[str, _AccountNonce] = {}
+
+    def _account(self, address: str) -> _AccountNonce:
+        state = self._accounts.get(address)
+        if state is None:
+            with self._lock:
+                state = self._accounts.setdefault(address, _AccountNonce(self._pipeline))
+        return state
+
+    def reserve(self, address: str) -> None:
+        """Wait for free pipeline slot ahead of `acquire`, so callers can keep the wait out of measured time"""
+        state = self._account(address)
+        state.slots.acquire()
+        with state.lock:
+            state.reserved += 1
+
+    def acquire(self, address: str) -> int:
+        """Reserve next nonce for account, takes slot from `reserve` or waits for free one"""
+        state = self._account(address)
+        with state.lock:
+            reserved = state.reserved > 0
+            if reserved:
+                state.reserved -= 1
+        if not reserved:
+            state.slots.acquire()
+        try:
+            with state.lock:
+                expired = state.outstanding == 0 and time.monotonic() - state.updated > self._timeout
+                if state.value is None or expired:
+                    state.value = self._fetch_nonce(address)
+                nonce = state.value
+                state.value += 1
+                state.outstanding += 1
+                state.updated = time.monotonic()
+        except Exception:
+            state.slots.release()
+            raise
+        return nonce
+
+    def unreserve(self, address: str) -> None:
+        """Give back slot of `reserve` which wasn't taken by `acquire` (transaction failed before getting nonce)"""
+        state = self._account(address)
+        with state.lock:
+            if state.reserved == 0:
+                return
+            state.reserved -= 1
+        state.slots.release()
+
+    def release(self, address: str) -> None:
+        """Transaction is finished (confirmed or dropped), free its pipeline slot"""
+        state = self._account(address)
+        with state.lock:
+            state.outstanding -= 1
+        state.slots.release()
+
+    def rollback(self, address: str, nonce: int, error: tp.Optional[Exception] = None) -> None:
+        """Transaction wasn't accepted by proxy, give back the nonce or resync it on nonce errors"""
+        state = self._account(address)
+        with state.lock:
+            if is_nonce_error(error) or state.value != nonce + 1:
+                state.value = None
+            else:
+                state.value = nonce
+        self.release(address)
+
+    def reset(self, address: tp.Optional[str] = None) -> None:
+        """Drop cached nonce of account (or all accounts), it will be requested from proxy on next use"""
+        states = [self._account(address)] if address else list(self._accounts.values())
+        for state in states:
+            with state.lock:
+                state.value = None
+
+
+def is_nonce_error(error: tp.Optional[Exception]) -> bool:
+    message = str(error).lower()
+    return any(err in message for err in NONCE_ERRORS)
+
+
+class ReceiptWaiter:
+    """Waits receipts of all outstanding transactions in one polling loop
+
+    Every tick pending hashes are requested in JSON-RPC batches of `batch_size`. Interval shrinks
+    to `min_interval` while receipts keep coming and grows by `backoff` up to `max_interval` when
+    a tick finds nothing or fails. Callers get `concurrent.futures.Future` resolved with receipt,
+    failed with the error `fetch_receipts` returned for its hash or with `TimeoutError` after `timeout` seconds.
+    Safe for threads and for greenlets.
+    """
+
+    def __init__(
+        self,
+        fetch_receipts: tp.Callable[[tp.List[bytes]], tp.List[tp.Union[web3.types.TxReceipt, None, Exception]]],
+        min_interval: float = 0.1,
+        max_interval: float = 5,
+        backoff: float = 2,
+        timeout: float = 120,
+        batch_size: int = 200,
+    ):
+        self._fetch_receipts = fetch_receipts
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._timeout = timeout
+        self._batch_size = batch_size
+        self.interval = min_interval
+        self._condition = threading.Condition()
+        self._pending: tp.Dict[bytes, tp.Tuple[float, concurrent.futures.Future]] = {}
+        self._thread: tp.Optional[threading.Thread] = None
+        self.requests = 0
+        self.resolved = 0
+
+    def submit(self, tx_hash: bytes) -> concurrent.futures.Future:
+        """Start waiting receipt of transaction, the same future is returned for the same hash"""
+        tx_hash = bytes(tx_hash)
+        with self._condition:
+            if tx_hash in self._pending:
+                return self._pending[tx_hash][1]
+            future = concurrent.futures.Future()
+            self._pending[tx_hash] = (time.monotonic() + self._timeout, future)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="receipt-waiter", daemon=True)
+                self._thread.start()
+            elif len(self._pending) == 1:
+                # waiter was idle with long interval, check new transaction soon
+                self.interval = self._min_interval
+                self._condition.notify()
+        return future
+
+    def wait(self, tx_hash: bytes) -> web3.types.TxReceipt:
+        """Block until receipt of transaction is available"""
+        return self.submit(tx_hash).result()
+
+    def stop(self) -> None:
+        """Stop polling, pending callers get `CancelledError`"""
+        with self._condition:
+            self._thread = None
+            pending, self._pending = self._pending, {}
+            self._condition.notify()
+        for _, future in pending.values():
+            future.cancel()
+
+    def stats(self) -> tp.Dict[str, float]:
+        return {"requests": self.requests, "resolved": self.resolved, "pending": len(self._pending)}
+
+    def _run(self) -> None:
+        current = threading.current_thread()
+        while True:
+            with self._condition:
+                while not self._pending and self._thread is current:
+                    self._condition.wait()
+                if self._thread is current:
+                    self._condition.wait(self.interval)
+                if self._thread is not current:
+                    # waiter is stopped
+                    return
+                hashes = list(self._pending)
+            self._tick(hashes)
+
+    def _tick(self, hashes: tp.List[bytes]) -> None:
+        found = 0
+        failed = False
+        for i in range(0, len(hashes), self._batch_size):
+            chunk = hashes[i : i + self._batch_size]
+            self.requests += 1
+            try:
+                receipts = self._fetch_receipts(chunk)
+            except Exception:
+                failed = True
+                continue
+            for tx_hash, receipt in zip(chunk, receipts):
+                if isinstance(receipt, Exception):
+                    self._resolve(tx_hash, error=receipt)
+                elif receipt is not None:
+                    found += 1
+                    self._resolve(tx_hash, receipt)
+        now = time.monotonic()
+        with self._condition:
+            expired = [tx_hash for tx_hash, (deadline, _) in self._pending.items() if deadline < now]
+        for tx_hash in expired:
+            self._resolve(
+                tx_hash,
+                error=TimeoutError(f"Transaction {tx_hash.hex()} isn't confirmed in {self._timeout} seconds"),
+            )
+        if found and not failed:
+            self.interval = max(self._min_interval, self.interval / self._backoff)
+        else:
+            self.interval = min(self._max_interval, self.interval * self._backoff)
+
+    def _resolve(
+        self,
+        tx_hash: bytes,
+        receipt: tp.Optional[web3.types.TxReceipt] = None,
+        error: tp.Optional[Exception] = None,
+    ) -> None:
+        with self._condition:
+            _, future = self._pending.pop(tx_hash, (None, None))
+        if future is None or future.done():
+            return
+        self.resolved += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(receipt)
 
 
 class NeonWeb3Client:
-    def __init__(self, proxy_url: str, chain_id: int, session: tp.Optional[tp.Any] = None):
+    def __init__(
+        self,
+        proxy_url: str,
+        chain_id: int,
+        session: tp.Optional[tp.Any] = None,
+        submit_only: bool = False,
+        nonce_pipeline: tp.Optional[int] = None,
+        metadata_cache: tp.Optional[TTLCache] = None,
+        gas_cache: tp.Optional[GasEstimateCache] = None,
+        receipt_waiter: tp.Optional[ReceiptWaiter] = None,
+    ):
         self._proxy_url = proxy_url
         self._web3 = web3.Web3(web3.HTTPProvider(proxy_url, session=session))
+        self.metadata_cache = metadata_cache
+        if metadata_cache is not None:
+            self._web3.middleware_onion.add(cache_middleware(metadata_cache), name="metadata_cache")
         self._chain_id = chain_id
         self._session = session
+        self.submit_only = submit_only
+        self.nonce_manager: tp.Optional[NonceManager] = None
+        if nonce_pipeline:
+            # pending block counts transactions in flight, so resync never gives out their nonces again
+            self.nonce_manager = NonceManager(
+                functools.partial(self._web3.eth.get_transaction_count, block_identifier="pending"),
+                pipeline=nonce_pipeline,
+            )
+        self.gas_cache = gas_cache
+        self.receipt_waiter = receipt_waiter
+        self._unconfirmed: tp.Dict[bytes, tp.Tuple[tp.Optional[str], tp.Dict]] = {}
 
     def __getattr__(self, item):
         return getattr(self._web3, item)
 
+    def _proxy_request(self, method: str):
+        response = self.metadata_cache.get(method) if self.metadata_cache is not None else None
+        if response is None:
+            response = requests.get(
+                self._proxy_url,
+                json={"jsonrpc": "2.0", "method": method, "params": [], "id": 0},
+            ).json()
+            if self.metadata_cache is not None and "error" not in response:
+                self.metadata_cache.set(method, response)
+        return response
+
     def get_proxy_version(self):
-        return requests.get(
-            self._proxy_url,
-            json={"jsonrpc": "2.0", "method": "neon_proxy_version", "params": [], "id": 0},
-        ).json()
+        return self._proxy_request("neon_proxy_version")
 
     def get_cli_version(self):
-        return requests.get(
-            self._proxy_url,
-            json={"jsonrpc": "2.0", "method": "neon_cli_version", "params": [], "id": 0},
-        ).json()
+        return self._proxy_request("neon_cli_version")
 
     def get_evm_version(self):
-        return requests.get(
-            self._proxy_url,
-            json={"jsonrpc": "2.0", "method": "web3_clientVersion", "params": [], "id": 0},
-        ).json()
+        return self._proxy_request("web3_clientVersion")
 
     def gas_price(self):
         gas = self._web3.eth.gas_price
         return gas
 
+    def chain_id(self):
+        return self._web3.eth.chain_id
+
     def create_account(self):
         return self._web3.eth.account.create()
 
@@ -50,6 +433,132 @@ class NeonWeb3Client:
     def get_block_number(self):
         return self._web3.eth.get_block_number()
 
+    def batch_request(self, calls: tp.List[tp.Tuple[str, tp.List]], return_errors: bool = False) -> tp.List[tp.Any]:
+        """Send (method, params) calls in one JSON-RPC batch, returns formatted results in calls order
+
+        Error of any call raises `ValueError`, with `return_errors` the error is returned in place of its result.
+        Response items with unknown or repeated ids are ignored, calls left without response get their own error.
+        """
+        if not calls:
+            return []
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i} for i, (method, params) in enumerate(calls)
+        ]
+        response = (self._session or requests).post(self._proxy_url, json=payload)
+        response.raise_for_status()
+        items = response.json()
+        if not isinstance(items, list):
+            raise ValueError(items.get("error", items))
+        results: tp.List[tp.Any] = [None] * len(calls)
+        answered = [False] * len(calls)
+        unexpected = []
+        for item in items:
+            i = item.get("id") if isinstance(item, dict) else None
+            if type(i) is not int or not 0 <= i < len(calls) or answered[i]:
+                unexpected.append(item)
+                continue
+            answered[i] = True
+            if "error" in item or "result" not in item:
+                results[i] = ValueError(item.get("error", item))
+                continue
+            results[i] = get_result_formatters(calls[i][0], self._web3.eth)(item["result"])
+        for i in range(len(calls)):
+            if not answered[i]:
+                error = f"No response to {calls[i][0]} in batch"
+                results[i] = ValueError(f"{error}, unexpected items: {unexpected}" if unexpected else error)
+        if not return_errors:
+            for result in results:
+                if isinstance(result, ValueError):
+                    raise result
+        return results
+
+    @staticmethod
+    def _addresses(addresses: tp.Iterable[tp.Union[str, eth_account.signers.local.LocalAccount]]) -> tp.List[str]:
+        return [address if isinstance(address, str) else address.address for address in addresses]
+
+    def get_balances(self, addresses: tp.Iterable[tp.Union[str, eth_account.signers.local.LocalAccount]]):
+        calls = [("eth_getBalance", [address, "latest"]) for address in self._addresses(addresses)]
+        return [web3.Web3.fromWei(balance, "ether") for balance in self.batch_request(calls)]
+
+    def get_nonces(self, addresses: tp.Iterable[tp.Union[str, eth_account.signers.local.LocalAccount]]):
+        return self.batch_request(
+            [("eth_getTransactionCount", [address, "latest"]) for address in self._addresses(addresses)]
+        )
+
+    def get_codes(self, addresses: tp.Iterable[tp.Union[str, eth_account.signers.local.LocalAccount]]):
+        return self.batch_request([("eth_getCode", [address, "latest"]) for address in self._addresses(addresses)])
+
+    def get_receipts(
+        self, tx_hashes: tp.Iterable[tp.Union[str, bytes]]
+    ) -> tp.List[tp.Union[web3.types.TxReceipt, None, ValueError]]:
+        """Receipts for transactions in one round trip, None for pending ones and `ValueError` for failed requests"""
+        return self.batch_request(
+            [("eth_getTransactionReceipt", [hexbytes.HexBytes(tx_hash).hex()]) for tx_hash in tx_hashes],
+            return_errors=True,
+        )
+
+    def _estimate_gas(self, transaction) -> int:
+        if self.gas_cache is None:
+            return self._web3.eth.estimate_gas(transaction)
+        return self.gas_cache.estimate(transaction, self._web3.eth.estimate_gas)
+
+    def _check_out_of_gas(self, transaction, receipt=None, error: tp.Optional[Exception] = None) -> None:
+        """Drop cached gas estimate if transaction ran out of gas"""
+        if self.gas_cache is None:
+            return
+        if error is not None and "out of gas" not in str(error).lower():
+            return
+        if receipt is not None and (receipt.get("status") or receipt.get("gasUsed", 0) < transaction["gas"]):
+            return
+        self.gas_cache.invalidate(transaction)
+
+    def _submit_transaction(
+        self, account: eth_account.signers.local.LocalAccount, transaction, wait_receipt: bool = False
+    ) -> tp.Union[web3.types.TxReceipt, hexbytes.HexBytes]:
+        """Sign and send transaction, in `submit_only` mode returns hash without waiting for receipt
+
+        Transactions without nonce get it from the nonce manager (or from proxy if there is no manager).
+        """
+        managed = "nonce" not in transaction and self.nonce_manager is not None
+        if managed:
+            transaction["nonce"] = self.nonce_manager.acquire(account.address)
+        elif "nonce" not in transaction:
+            transaction["nonce"] = self._web3.eth.get_transaction_count(account.address)
+
+        try:
+            signed_tx = self._web3.eth.account.sign_transaction(transaction, account.key)
+            tx = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        except Exception as err:
+            if managed:
+                self.nonce_manager.rollback(account.address, transaction["nonce"], err)
+            self._check_out_of_gas(transaction, error=err)
+            raise
+
+        if self.submit_only and not wait_receipt:
+            self._unconfirmed[bytes(tx)] = (account.address if managed else None, transaction)
+            return tx
+        try:
+            receipt = self.wait_for_receipt(tx)
+        finally:
+            if managed:
+                self.nonce_manager.release(account.address)
+        self._check_out_of_gas(transaction, receipt=receipt)
+        return receipt
+
+    def wait_for_receipt(self, tx_hash: bytes) -> web3.types.TxReceipt:
+        """Wait receipt with shared batched waiter if client has one, or poll the hash alone"""
+        if self.receipt_waiter is not None:
+            return self.receipt_waiter.wait(tx_hash)
+        return self._web3.eth.wait_for_transaction_receipt(tx_hash)
+
+    def finish_transaction(self, tx_hash: bytes, receipt: tp.Optional[web3.types.TxReceipt] = None) -> None:
+        """Submitted transaction is confirmed (receipt) or dropped, must be called in `submit_only` mode"""
+        address, transaction = self._unconfirmed.pop(bytes(tx_hash), (None, None))
+        if address is not None:
+            self.nonce_manager.release(address)
+        if transaction is not None and receipt is not None:
+            self._check_out_of_gas(transaction, receipt=receipt)
+
     def send_neon(
         self,
         from_: eth_account.signers.local.LocalAccount,
@@ -57,7 +566,7 @@ class NeonWeb3Client:
         amount: tp.Union[int, float, Decimal],
         gas: tp.Optional[int] = 0,
         gas_price: tp.Optional[int] = None,
-    ) -> web3.types.TxReceipt:
+    ) -> tp.Union[web3.types.TxReceipt, hexbytes.HexBytes]:
         to_addr = to if isinstance(to, str) else to.address
         gas_price = gas_price or self.gas_price()
         transaction = {
@@ -65,16 +574,13 @@ class NeonWeb3Client:
             "to": to_addr,
             "value": web3.Web3.toWei(amount, "ether"),
             "chainId": self._chain_id,
-            "gasPrice": gas_price or self.gas_price(),
+            "gasPrice": gas_price,
             "gas": gas,
-            "nonce": self._web3.eth.get_transaction_count(from_.address),
         }
         if transaction["gas"] == 0:
-            transaction["gas"] = self._web3.eth.estimate_gas(transaction)
+            transaction["gas"] = self._estimate_gas(transaction)
 
-        signed_tx = self._web3.eth.account.sign_transaction(transaction, from_.key)
-        tx = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        return self._web3.eth.wait_for_transaction_receipt(tx)
+        return self._submit_transaction(from_, transaction)
 
     def deploy_contract(
         self,
@@ -85,7 +591,7 @@ class NeonWeb3Client:
         gas_price: tp.Optional[int] = None,
         constructor_args: tp.Optional[tp.List] = None,
     ):
-        """Proxy doesn't support send_transaction"""
+        """Proxy doesn't support send_transaction, always waits for receipt to get the contract address"""
         gas_price = gas_price or self.gas_price()
         constructor_args = constructor_args or []
 
@@ -96,16 +602,13 @@ class NeonWeb3Client:
                 "from": from_.address,
                 "gas": gas,
                 "gasPrice": gas_price,
-                "nonce": self._web3.eth.get_transaction_count(from_.address),
             }
         )
 
         if transaction["gas"] == 0:
-            transaction["gas"] = self._web3.eth.estimate_gas(transaction)
+            transaction["gas"] = self._estimate_gas(transaction)
 
-        signed_tx = self._web3.eth.account.sign_transaction(transaction, from_.key)
-        tx = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        return self._web3.eth.wait_for_transaction_receipt(tx)
+        return self._submit_transaction(from_, transaction, wait_receipt=True)
 
     def send_erc20(
         self,
@@ -125,27 +628,22 @@ class NeonWeb3Client:
                 "chainId": self._chain_id,
                 "gas": gas,
                 "gasPrice": gas_price,
-                "nonce": self._web3.eth.get_transaction_count(from_.address),
                 "from": from_.address,
             }
         )
 
         if transaction["gas"] == 0:
-            transaction["gas"] = self._web3.eth.estimate_gas(transaction)
+            transaction["gas"] = self._estimate_gas(transaction)
 
-        signed_tx = self._web3.eth.account.sign_transaction(transaction, from_.key)
-        tx = self._web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        return self._web3.eth.wait_for_transaction_receipt(tx)
+        return self._submit_transaction(from_, transaction)
 
     def send_transaction(
         self, account: eth_account.signers.local.LocalAccount, transaction, gas: tp.Optional[int] = None
     ):
         if "gasPrice" not in transaction:
-            transaction["gasPrice"] = (self.gas_price(),)
+            transaction["gasPrice"] = self.gas_price()
 
-        if "gas" not in transaction:
-            transaction["gas"] = self._web3.eth.estimate_gas(transaction)
+        if not transaction.get("gas"):
+            transaction["gas"] = self._estimate_gas(transaction)
 
-        instruction_tx = self._web3.eth.account.sign_transaction(transaction, account.key)
-        signature = self._web3.eth.send_raw_transaction(instruction_tx.rawTransaction)
-        return self._web3.eth.wait_for_transaction_receipt(signature)
+        return self._submit_transaction(account, transaction)